@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def temp_cache(settings, tmp_path):
+    """У каждого теста свой файл кэша во временном каталоге.
+
+    Иначе cache.clear() в тестах стирает yatube/cache.sqlite3
+    запущенного сайта, а записи одного теста видны следующему.
+    """
+    cache = dict(settings.CACHES['default'])
+    cache['LOCATION'] = str(tmp_path / 'cache.sqlite3')
+    settings.CACHES = {'default': cache}
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def temp_media_root(settings, tmp_path):
+    """Файлы, которые создают тесты (mixer, формы), - во временном каталоге.
+
+    Иначе картинки постов остаются в yatube/media рабочего дерева.
+    """
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+
+
+@pytest.fixture(autouse=True)
+def temp_metrics_dirs(settings, tmp_path):
+    """Счетчики /metrics и профили запросов - тоже во временном каталоге."""
+    settings.METRICS_DIR = str(tmp_path / 'metrics')
+    settings.PROFILING_DIR = str(tmp_path / 'profiles')
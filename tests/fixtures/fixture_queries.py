@@ -0,0 +1,32 @@
+import pytest
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+@pytest.fixture
+def query_budget(settings):
+    """Строгий режим QueryBudgetMiddleware: превышение бюджета роняет тест.
+
+    Возвращает функцию, достающую QueryStats из ответа тестового клиента.
+    """
+    settings.QUERY_BUDGET_STRICT = True
+
+    def stats(response):
+        return response.wsgi_request.query_stats
+    return stats
+
+
+@pytest.fixture
+def busy_feed(mixer, user, another_user, group):
+    """Полная страница ленты с группами, подпиской и комментариями."""
+    mixer.blend(Follow, user=user, author=another_user)
+    posts = mixer.cycle(15).blend(
+        Post, author=another_user, group=group, image=''
+    )
+    commenters = mixer.cycle(5).blend('auth.User')
+    for i in range(20):
+        Comment.objects.create(
+            post=posts[0], author=commenters[i % 5], text=f'comment {i}'
+        )
+    UserStats.objects.for_user(another_user)
+    return posts[0]
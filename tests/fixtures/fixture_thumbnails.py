@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings):
+    """Миниатюры создаются в потоке теста, а не фоновым пулом.
+
+    Иначе задача, поставленная одним тестом, может писать в MEDIA_ROOT,
+    который фикстура mock_media следующего теста уже удаляет.
+    """
+    settings.THUMBNAIL_PIPELINE_ASYNC = False
@@ -0,0 +1,38 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+
+VIEW_URLS = {
+    'posts:index': lambda post: '/',
+    'posts:group_list': lambda post: f'/group/{post.group.slug}/',
+    'posts:profile': lambda post: f'/profile/{post.author.username}/',
+    'posts:post_detail': lambda post: f'/posts/{post.id}/',
+    'posts:follow_index': lambda post: '/follow/',
+}
+
+
+class TestQueryBudget:
+
+    def test_every_feed_view_has_budget(self):
+        for view_name in VIEW_URLS:
+            assert view_name in settings.QUERY_BUDGETS, (
+                f'Задайте бюджет запросов для `{view_name}` '
+                'в `settings.QUERY_BUDGETS`'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('view_name', VIEW_URLS)
+    def test_view_within_query_budget(self, view_name, user_client,
+                                      busy_feed, query_budget):
+        cache.clear()
+        url = VIEW_URLS[view_name](busy_feed)
+        response = user_client.get(url)
+        assert response.status_code == 200, (
+            f'Страница `{url}` должна открываться'
+        )
+        stats = query_budget(response)
+        assert response.wsgi_request.resolver_match.view_name == view_name
+        assert stats.count <= settings.QUERY_BUDGETS[view_name], (
+            f'`{view_name}` выполнил {stats.count} SQL-запросов '
+            f'при бюджете {settings.QUERY_BUDGETS[view_name]}'
+        )
@@ -0,0 +1,125 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Comment, Group, Post, User
+from posts.tests.test_thumbnails import jpeg_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def read(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   THUMBNAIL_PIPELINE_ASYNC=False)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='NoName', first_name='Имя')
+        cls.group = Group.objects.create(
+            title='test-text', slug='test-slug', description='description')
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {number}')
+            for number in range(12)
+        )
+        # bulk_create не вызывает сигналы, счетчики - как после загрузки.
+        call_command('reconcile_counters', stdout=StringIO())
+        cls.post = Post.objects.create(author=cls.user, text='Последний')
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'comment {number}')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url, **params):
+        """Все записи ленты, пройденные по курсорам next."""
+        results, cursor = [], None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            data = read(self.client.get(url, query))
+            results.extend(data['results'])
+            cursor = data['next']
+            if cursor is None:
+                return results, data
+
+    def test_endpoints_stream_json(self):
+        urls = {
+            reverse('api:posts'): 13,
+            reverse('api:group', args=('test-slug',)): 12,
+            reverse('api:profile', args=('NoName',)): 13,
+            reverse('api:comments', args=(self.post.pk,)): 3,
+        }
+        for url, total in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                results, _ = self.walk(url, limit=5)
+                self.assertEqual(len(results), total)
+                self.assertEqual(len({item['id'] for item in results}), total)
+
+    def test_headers(self):
+        data = read(self.client.get(reverse('api:profile', args=('NoName',))))
+        self.assertEqual(data['author']['full_name'], 'Имя')
+        self.assertEqual(data['author']['post_count'], 13)
+        data = read(self.client.get(reverse('api:group', args=('test-slug',))))
+        self.assertEqual(data['group']['title'], 'test-text')
+        data = read(self.client.get(
+            reverse('api:comments', args=(self.post.pk,))))
+        self.assertEqual(data['post'], self.post.pk)
+
+    def test_post_fields(self):
+        data = read(self.client.get(reverse('api:posts'), {'limit': 1}))
+        self.assertEqual(data['results'], [{
+            'id': self.post.pk,
+            'url': reverse('posts:post_detail', args=(self.post.pk,)),
+            'text': 'Последний',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'NoName',
+            'group': None,
+            'comment_count': 3,
+            'image': None,
+            'thumbnail': None,
+        }])
+
+    def test_thumbnail_only_from_kvstore(self):
+        post = Post.objects.create(
+            author=self.user, text='image', image=jpeg_upload())
+        url = reverse('api:posts')
+        first = read(self.client.get(url, {'limit': 1}))['results'][0]
+        self.assertEqual(first['image'], post.image.url)
+        self.assertIsNone(first['thumbnail'])
+        thumbnails.generate(post.image.name)
+        first = read(self.client.get(url, {'limit': 1}))['results'][0]
+        self.assertTrue(first['thumbnail'].startswith(
+            settings.MEDIA_URL + 'cache/'))
+
+    def test_bad_parameters(self):
+        url = reverse('api:posts')
+        for params in ({'cursor': 'broken'}, {'limit': 'many'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+        self.assertEqual(
+            self.client.get(reverse('api:group', args=('nope',))).status_code,
+            404)
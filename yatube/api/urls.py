@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/comments/', views.comments, name='comments'),
+    path('group/<slug:slug>/', views.group, name='group'),
+    path('profile/<str:username>/', views.profile, name='profile'),
+]
@@ -0,0 +1,152 @@
+"""Read-only JSON API лент для мобильных клиентов и интеграций.
+
+Страницы листаются курсором (keyset по pub_date, id), а ответ
+сериализуется по одной записи через StreamingHttpResponse: в памяти не
+собирается ни список объектов, ни весь JSON. Ссылки на миниатюры берутся
+только из key-value хранилища sorl, картинки в запросе не генерируются.
+"""
+import json
+from functools import wraps
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Comment, Group, Post, User, UserStats
+from posts.utils import (LAST_10_POSTS, CursorPaginator, decode_cursor,
+                         encode_cursor)
+
+MAX_LIMIT: int = 100
+ITERATOR_CHUNK: int = 100
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', LAST_10_POSTS))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def get_cursor(request):
+    token = request.GET.get('cursor')
+    if not token:
+        return None
+    cursor = decode_cursor(token)
+    if cursor is None or cursor[0] != 'next':
+        raise BadRequest('Неверный cursor')
+    return cursor
+
+
+def serialize_post(post):
+    thumbnail = thumbnails.lookup(post.image, thumbnails.POST_CARD[0],
+                                  **thumbnails.POST_CARD[1])
+    return {
+        'id': post.pk,
+        'url': reverse('posts:post_detail', args=(post.pk,)),
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'comment_count': post.comment_count,
+        'image': post.image.url if post.image else None,
+        'thumbnail': thumbnail.url if thumbnail is not None else None,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'pub_date': comment.pub_date.isoformat(),
+        'author': comment.author.username,
+    }
+
+
+def stream(header, queryset, serialize, cursor, limit):
+    """Генератор JSON-объекта {...header, "results": [...], "next": ...}.
+
+    Берет limit + 1 записей, чтобы узнать, есть ли следующая страница,
+    и пишет курсор после списка, когда последняя запись уже известна.
+    """
+    rows = CursorPaginator(queryset, limit).rows(cursor)
+    yield dumps(header)[:-1] + (', ' if header else '') + '"results": ['
+    last, count, has_next = None, 0, False
+    for obj in rows[:limit + 1].iterator(chunk_size=ITERATOR_CHUNK):
+        if count == limit:
+            has_next = True
+            break
+        yield (', ' if count else '') + dumps(serialize(obj))
+        last, count = obj, count + 1
+    next_cursor = encode_cursor('next', last) if has_next else None
+    yield '], "next": ' + dumps(next_cursor) + '}'
+
+
+def api_view(view):
+    """Превращает BadRequest в ответ 400 с описанием ошибки."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    return wrapper
+
+
+def streaming_response(request, header, queryset, serialize):
+    limit, cursor = get_limit(request), get_cursor(request)
+    return StreamingHttpResponse(
+        stream(header, queryset, serialize, cursor, limit),
+        content_type='application/json',
+    )
+
+
+@api_view
+def posts(request):
+    return streaming_response(
+        request, {}, Post.objects.for_feed(), serialize_post)
+
+
+@api_view
+def group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    header = {'group': {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }}
+    return streaming_response(
+        request, header, group.posts.for_feed(), serialize_post)
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    stats = UserStats.objects.for_user(author)
+    header = {'author': {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'post_count': stats.post_count,
+        'follower_count': stats.follower_count,
+        'following_count': stats.following_count,
+    }}
+    return streaming_response(
+        request, header, author.posts.for_feed(), serialize_post)
+
+
+@api_view
+def comments(request, post_id):
+    post = get_object_or_404(
+        Post.objects.only('pk', 'comment_count'), pk=post_id)
+    header = {'post': post.pk, 'comment_count': post.comment_count}
+    return streaming_response(
+        request, header, Comment.objects.for_post(post), serialize_comment)
@@ -0,0 +1,12 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, в котором транзакции сразу берут блокировку записи.
+
+    BEGIN IMMEDIATE ждет освободившуюся базу в пределах busy_timeout, а
+    не падает на первой записи после чтения внутри транзакции.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,32 @@
+import time
+
+from django.template.backends import django as backend
+
+from core import metrics
+
+
+class Template(backend.Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.observe(
+                'yatube_template_render_seconds',
+                {'template': self.origin.template_name or '<string>'},
+                time.perf_counter() - start,
+            )
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    """Шаблоны Django с замером рендера для /metrics.
+
+    Замеряется шаблон, переданный в render() или get_template(), вместе
+    со всеми вложенными include.
+    """
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
@@ -0,0 +1,321 @@
+"""Кэш в файле SQLite, общий для всех процессов на хосте.
+
+В отличие от LocMemCache одна копия кэша видна всем воркерам gunicorn,
+поэтому фрагмент ленты рендерится один раз на хост, а смена версии
+области сразу доходит до всех процессов. Файл открыт в режиме WAL:
+читатели не блокируют писателя и друг друга.
+
+Целые числа хранятся как INTEGER, остальное сериализуется pickle; incr
+выполняется под блокировкой записи и атомарен между процессами. Число
+записей и их объем ведут триггеры в служебной таблице, а при превышении
+MAX_ENTRIES или MAX_SIZE удаляются просроченные и давно не читавшиеся
+записи (приближенный LRU). Чтение не берет блокировку записи: время
+доступа копится в процессе и пишется одной транзакцией не чаще раза в
+ACCESS_RESOLUTION секунд или вместе с ближайшей записью в кэш.
+
+Пример настройки:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'MAX_SIZE': 64 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+BUSY_TIMEOUT: int = 5000
+ACCESS_RESOLUTION: int = 10
+CHUNK_SIZE: int = 500
+INTEGER_SIZE: int = 8
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    'key TEXT PRIMARY KEY, value BLOB, size INTEGER NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed '
+    'ON cache_entry (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    'id INTEGER PRIMARY KEY CHECK (id = 1), '
+    'entries INTEGER NOT NULL, bytes INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_insert '
+    'AFTER INSERT ON cache_entry BEGIN '
+    'UPDATE cache_stats SET entries = entries + 1, '
+    'bytes = bytes + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_delete '
+    'AFTER DELETE ON cache_entry BEGIN '
+    'UPDATE cache_stats SET entries = entries - 1, '
+    'bytes = bytes - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_resize '
+    'AFTER UPDATE OF size ON cache_entry BEGIN '
+    'UPDATE cache_stats SET bytes = bytes - old.size + new.size; END',
+)
+
+UPSERT = (
+    'INSERT INTO cache_entry (key, value, size, expires, accessed) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, size = excluded.size, '
+    'expires = excluded.expires, accessed = excluded.accessed'
+)
+
+
+@contextmanager
+def write(conn):
+    """BEGIN IMMEDIATE ... COMMIT: блокировка записи берется сразу.
+
+    Иначе два процесса, начавшие с чтения, могут упереться друг в друга
+    при повышении блокировки и получить SQLITE_BUSY без ожидания.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def encode(value):
+    """Возвращает (значение для столбца, размер в байтах)."""
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value, INTEGER_SIZE
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def decode(raw):
+    if isinstance(raw, int):
+        return raw
+    return pickle.loads(raw)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self._max_size = options.get('MAX_SIZE')
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._access_lock = threading.Lock()
+        self._accessed = {}
+        self._flushed = 0.0
+
+    @property
+    def connection(self):
+        """Одно соединение на поток; после fork открывается новое."""
+        local = self._local
+        pid = os.getpid()
+        if getattr(local, 'pid', None) != pid:
+            local.connection = self._connect()
+            local.pid = pid
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self.location, timeout=BUSY_TIMEOUT / 1000,
+            isolation_level=None, check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT}')
+        with self._schema_lock:
+            if not self._schema_ready:
+                with write(conn):
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                self._schema_ready = True
+        return conn
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _alive(self, expires, now):
+        return expires is None or expires > now
+
+    def _write_accessed(self, conn):
+        """Записывает накопленные времена доступа в транзакции conn."""
+        with self._access_lock:
+            pending, self._accessed = self._accessed, {}
+            self._flushed = time.time()
+        if pending:
+            conn.executemany(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in pending.items()],
+            )
+
+    def _note_accessed(self, keys, now):
+        with self._access_lock:
+            self._accessed.update(dict.fromkeys(keys, now))
+            due = (bool(self._accessed)
+                   and now - self._flushed >= ACCESS_RESOLUTION)
+        if due:
+            with write(self.connection) as conn:
+                self._write_accessed(conn)
+
+    def _fetch(self, keys):
+        """{ключ: значение} живых записей; время доступа - отложенно."""
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            rows = self.connection.execute(
+                'SELECT key, value, expires, accessed FROM cache_entry '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk,
+            )
+            for key, raw, expires, accessed in rows:
+                if not self._alive(expires, now):
+                    continue
+                found[key] = decode(raw)
+                if accessed < now - ACCESS_RESOLUTION:
+                    stale.append(key)
+        self._note_accessed(stale, now)
+        return found
+
+    def _store(self, conn, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        conn.executemany(UPSERT, [
+            (key, *encode(value), expires, now) for key, value in items
+        ])
+
+    def _overflow(self, conn):
+        """Число записей, если кэш вышел за пределы, иначе None."""
+        entries, size = conn.execute(
+            'SELECT entries, bytes FROM cache_stats').fetchone()
+        too_big = self._max_size is not None and size > self._max_size
+        if entries > self._max_entries or too_big:
+            return entries
+        return None
+
+    def _cull(self, conn):
+        # Запись уже держит блокировку: заодно сохраняются времена
+        # доступа, чтобы вытеснение видело свежие.
+        self._write_accessed(conn)
+        if self._overflow(conn) is None:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache_entry')
+            return
+        conn.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (time.time(),))
+        entries = self._overflow(conn)
+        if entries is None:
+            return
+        conn.execute(
+            'DELETE FROM cache_entry WHERE key IN ('
+            'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+            (max(entries // self._cull_frequency, 1),),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(mapping))
+        return {mapping[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with write(self.connection) as conn:
+            self._store(conn, [(key, value)], timeout)
+            self._cull(conn)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [(self._key(key, version), value)
+                 for key, value in data.items()]
+        with write(self.connection) as conn:
+            self._store(conn, items, timeout)
+            self._cull(conn)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with write(self.connection) as conn:
+            row = conn.execute(
+                'SELECT expires FROM cache_entry WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            self._store(conn, [(key, value)], timeout)
+            self._cull(conn)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with write(self.connection) as conn:
+            cursor = conn.execute(
+                'UPDATE cache_entry SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, now),
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись в одной транзакции."""
+        key = self._key(key, version)
+        now = time.time()
+        with write(self.connection) as conn:
+            row = conn.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = decode(row[0]) + delta
+            raw, size = encode(value)
+            conn.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (raw, size, now, key),
+            )
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self.connection.execute(
+            'SELECT expires FROM cache_entry WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        deleted = 0
+        with write(self.connection) as conn:
+            for start in range(0, len(keys), CHUNK_SIZE):
+                chunk = keys[start:start + CHUNK_SIZE]
+                deleted += conn.execute(
+                    'DELETE FROM cache_entry '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk,
+                ).rowcount
+        return deleted > 0
+
+    def clear(self):
+        with write(self.connection) as conn:
+            conn.execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение потока
+        # переиспользуется, чтобы не платить за открытие файла и PRAGMA.
+        pass
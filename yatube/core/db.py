@@ -0,0 +1,106 @@
+"""Настройка SQLite для конкурентной нагрузки.
+
+При открытии каждого соединения применяются PRAGMA из настройки
+SQLITE_PRAGMAS (поверх SQLITE_PRAGMAS по умолчанию): WAL, чтобы читатели
+не ждали писателя, busy_timeout, synchronous, mmap_size и cache_size.
+
+Транзакции открываются как BEGIN IMMEDIATE (см. core.backends.sqlite3):
+при обычном BEGIN транзакция, начавшая с чтения, не может получить
+блокировку записи, если ее уже взял другой процесс, и падает с
+"database is locked" сразу, без ожидания busy_timeout. Изменяющие
+view оборачиваются write_view: транзакция плюс повтор при блокировке.
+"""
+import functools
+import logging
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    # В режиме WAL NORMAL не теряет целостность, а fsync делается
+    # только при checkpoint.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 2 ** 20,
+    # Отрицательное значение - размер в КиБ, а не в страницах.
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+RETRY_ATTEMPTS: int = 5
+RETRY_DELAY: float = 0.05
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Ошибки Django и "сырого" sqlite3 (команда bench_sqlite).
+DATABASE_ERRORS = (OperationalError, sqlite3.OperationalError)
+
+
+def sqlite_pragmas():
+    return {**SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA для новых соединений SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, sqlite_pragmas())
+
+
+def is_locked(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_on_locked(func=None, *, attempts=RETRY_ATTEMPTS,
+                    delay=RETRY_DELAY):
+    """Повторяет func, если SQLite ответил "database is locked".
+
+    Пауза растет вдвое с каждой попыткой, со случайным разбросом, чтобы
+    конкурирующие процессы не повторяли запрос одновременно. Внутри
+    открытой транзакции повтор не делается: ее уже не спасти, ошибка
+    уходит наружу к внешнему retry_on_locked.
+    """
+    if func is None:
+        return functools.partial(
+            retry_on_locked, attempts=attempts, delay=delay)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except DATABASE_ERRORS as error:
+                if (attempt == attempts or connection.in_atomic_block
+                        or not is_locked(error)):
+                    raise
+                logger.info('%s: база занята, попытка %s из %s',
+                            func.__qualname__, attempt, attempts)
+                time.sleep(delay * 2 ** (attempt - 1) * random.random())
+
+    return wrapper
+
+
+def write_view(view):
+    """Изменяющий запрос view целиком в одной транзакции с повтором.
+
+    GET и HEAD выполняются как есть и не берут блокировку записи.
+    """
+    atomic_view = retry_on_locked(transaction.atomic(view))
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        return atomic_view(request, *args, **kwargs)
+
+    return wrapper
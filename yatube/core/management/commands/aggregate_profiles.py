@@ -0,0 +1,68 @@
+import io
+import os
+import pstats
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = ('Сводит профили ProfilingMiddleware по каждому view: топ '
+            'функций pstats по всем сохраненным запросам и, с '
+            '--collapsed, общий файл стеков для flamegraph.pl.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Имена view, например posts:profile (по умолчанию все).')
+        parser.add_argument('--dir', help='Каталог профилей '
+                                          '(по умолчанию PROFILING_DIR).')
+        parser.add_argument('--sort', choices=SORT_KEYS,
+                            default='cumulative')
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument(
+            '--collapsed', metavar='DIR',
+            help='Куда записать <view>.collapsed со сложенными стеками.')
+
+    def directories(self, root, views):
+        if not os.path.isdir(root):
+            raise CommandError(f'Каталог {root} не найден.')
+        names = [os.path.basename(profiling.view_directory(view))
+                 for view in views] or sorted(os.listdir(root))
+        return [(name, os.path.join(root, name)) for name in names
+                if os.path.isdir(os.path.join(root, name))]
+
+    def handle(self, *args, **options):
+        root = options['dir'] or profiling.profiling_dir()
+        directories = self.directories(root, options['views'])
+        if not directories:
+            raise CommandError('Профилей не найдено.')
+        if options['collapsed']:
+            os.makedirs(options['collapsed'], exist_ok=True)
+        for name, directory in directories:
+            files = sorted(os.path.join(directory, file)
+                           for file in os.listdir(directory))
+            profiles = [file for file in files if file.endswith('.prof')]
+            if not profiles:
+                continue
+            output = io.StringIO()
+            stats = pstats.Stats(*profiles, stream=output)
+            stats.strip_dirs().sort_stats(options['sort'])
+            stats.print_stats(options['limit'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: запросов {len(profiles)}, '
+                f'{stats.total_tt / len(profiles) * 1000:.1f} мс в среднем'))
+            self.stdout.write(output.getvalue())
+            if options['collapsed']:
+                stacks = Counter()
+                for file in files:
+                    if file.endswith('.collapsed'):
+                        stacks.update(profiling.read_collapsed(file))
+                target = os.path.join(options['collapsed'],
+                                      f'{name}.collapsed')
+                profiling.write_collapsed(stacks, target)
+                self.stdout.write(f'Стеки: {target}')
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = (
+    ('locmem', 'django.core.cache.backends.locmem.LocMemCache', ''),
+    ('file', 'django.core.cache.backends.filebased.FileBasedCache',
+     'file'),
+    ('sqlite', 'core.cache.SQLiteCache', 'cache.sqlite3'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность кэшей LocMem, файлового '
+            'и SQLite на типичных операциях ленты (операций в секунду).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000)
+        parser.add_argument('--value-size', type=int, default=4096,
+                            help='Размер значения в байтах '
+                                 '(фрагмент страницы ленты).')
+        parser.add_argument('--batch', type=int, default=20)
+
+    def cases(self, cache, ops, value, batch):
+        keys = [f'key:{number}' for number in range(ops)]
+        batches = [keys[start:start + batch]
+                   for start in range(0, ops, batch)]
+        return (
+            ('set', ops, lambda: [cache.set(key, value) for key in keys]),
+            ('get', ops, lambda: [cache.get(key) for key in keys]),
+            ('get miss', ops, lambda: [cache.get('miss:' + key)
+                                       for key in keys]),
+            ('set_many', ops, lambda: [
+                cache.set_many(dict.fromkeys(chunk, value))
+                for chunk in batches
+            ]),
+            ('get_many', ops, lambda: [cache.get_many(chunk)
+                                       for chunk in batches]),
+            ('incr', ops, lambda: (cache.set('counter', 0), [
+                cache.incr('counter') for _ in keys
+            ])),
+        )
+
+    def handle(self, *args, **options):
+        ops, batch = options['ops'], options['batch']
+        value = 'x' * options['value_size']
+        directory = tempfile.mkdtemp()
+        results = {}
+        try:
+            for name, backend, location in BACKENDS:
+                cache = import_string(backend)(
+                    os.path.join(directory, location) if location else name,
+                    {'OPTIONS': {'MAX_ENTRIES': ops * 2}},
+                )
+                for case, count, run in self.cases(cache, ops, value, batch):
+                    start = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - start
+                    results.setdefault(case, {})[name] = count / elapsed
+                cache.clear()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        names = [name for name, _, _ in BACKENDS]
+        self.stdout.write(
+            f'{"ops/s":<12}' + ''.join(f'{name:>14}' for name in names))
+        for case, row in results.items():
+            self.stdout.write(
+                f'{case:<12}' + ''.join(f'{row[name]:>14.0f}'
+                                        for name in names))
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core import ratelimit
+from core.middleware import RateLimitMiddleware
+from posts.management.commands.load_test import percentile
+
+SCOPE = 'bench_ratelimit'
+# Правило, которое никогда не срабатывает, и правило, которое
+# отказывает со второго запроса.
+OPEN_RULE = {'user': '1000000/s', 'ip': '1000000/s'}
+CLOSED_RULE = {'ip': '1/d'}
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы ограничения частоты на запрос: '
+            'view без правила, разрешенный запрос и отказ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def measure(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return statistics.mean(samples), percentile(samples, 99)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().post('/', REMOTE_ADDR='192.0.2.1')
+        request.user = get_user_model()(pk=0)
+        request.resolver_match = None
+        middleware = RateLimitMiddleware(lambda request: None)
+        cases = (
+            ('view без правила',
+             lambda: middleware.process_view(request, None, (), {})),
+            ('разрешен (user + ip)',
+             lambda: ratelimit.check(request, SCOPE + ':open', OPEN_RULE)),
+            ('отказ (ip)',
+             lambda: ratelimit.check(request, SCOPE + ':closed',
+                                     CLOSED_RULE)),
+        )
+        self.stdout.write(f'{"case":<24}{"mean ms":>10}{"p99 ms":>10}')
+        try:
+            for name, func in cases:
+                mean, p99 = self.measure(func, options['repeat'])
+                self.stdout.write(f'{name:<24}{mean:>10.3f}{p99:>10.3f}')
+        finally:
+            cache.delete_many([
+                f'{ratelimit.PREFIX}{key}'
+                for scope, rule in ((SCOPE + ':open', OPEN_RULE),
+                                    (SCOPE + ':closed', CLOSED_RULE))
+                for _, key, _ in ratelimit.buckets(request, scope, rule)
+            ])
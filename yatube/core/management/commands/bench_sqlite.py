@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas, retry_on_locked, sqlite_pragmas
+from posts.management.commands.load_test import percentile
+
+# До: как стандартный бэкенд Django (журнал DELETE, BEGIN, timeout 5 с).
+# После: PRAGMA из core.db, BEGIN IMMEDIATE и повтор при блокировке.
+MODES = (
+    ('default', 'DELETE, BEGIN'),
+    ('tuned', 'WAL + PRAGMA, BEGIN IMMEDIATE, повтор'),
+)
+DEFAULT_TIMEOUT: float = 5.0
+PAGE_SIZE: int = 10
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL, '
+    'comment_count INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, '
+    'post_id INTEGER NOT NULL, text TEXT NOT NULL)',
+    'CREATE INDEX comment_post ON comment (post_id)',
+)
+
+
+def connect(path, mode):
+    conn = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT,
+                           isolation_level=None)
+    if mode == 'tuned':
+        apply_pragmas(conn.cursor(), sqlite_pragmas())
+    return conn
+
+
+def create_database(path, mode, posts):
+    conn = connect(path, mode)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO post (text) VALUES (?)',
+                     (('x' * 500,) for _ in range(posts)))
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def read(conn, rnd, posts):
+    """Страница ленты: посты и общее число, как в paginator_create."""
+    conn.execute('SELECT COUNT(*) FROM post').fetchone()
+    conn.execute(
+        'SELECT id, text, comment_count FROM post ORDER BY id DESC '
+        'LIMIT ? OFFSET ?',
+        (PAGE_SIZE, rnd.randrange(max(posts - PAGE_SIZE, 1))),
+    ).fetchall()
+
+
+def write(conn, rnd, posts, begin):
+    """Комментарий: чтение поста, вставка и счетчик в одной транзакции."""
+    post_id = rnd.randint(1, posts)
+    conn.execute(begin)
+    try:
+        conn.execute('SELECT comment_count FROM post WHERE id = ?',
+                     (post_id,)).fetchone()
+        conn.execute('INSERT INTO comment (post_id, text) VALUES (?, ?)',
+                     (post_id, 'y' * 200))
+        conn.execute('UPDATE post SET comment_count = comment_count + 1 '
+                     'WHERE id = ?', (post_id,))
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def worker(args):
+    path, mode, seconds, write_share, posts, seed = args
+    rnd = random.Random(seed)
+    conn = connect(path, mode)
+    if mode == 'tuned':
+        do_write = retry_on_locked(write)
+        begin = 'BEGIN IMMEDIATE'
+    else:
+        do_write, begin = write, 'BEGIN'
+    result = {'reads': [], 'writes': [], 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        is_write = rnd.random() < write_share
+        start = time.perf_counter()
+        try:
+            if is_write:
+                do_write(conn, rnd, posts, begin)
+            else:
+                read(conn, rnd, posts)
+        except sqlite3.OperationalError:
+            result['errors'] += 1
+            continue
+        result['writes' if is_write else 'reads'].append(
+            time.perf_counter() - start)
+    conn.close()
+    return result
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SQLite со стандартными настройками и с PRAGMA, '
+            'BEGIN IMMEDIATE и повтором из core.db: чтения и записи в '
+            'секунду, ошибки "database is locked" и p95 при конкурентных '
+            'процессах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--write-share', type=float, default=0.2,
+                            help='Доля записей среди операций.')
+        parser.add_argument('--posts', type=int, default=2000)
+
+    def run(self, mode, directory, options):
+        path = os.path.join(directory, f'{mode}.sqlite3')
+        create_database(path, mode, options['posts'])
+        tasks = [
+            (path, mode, options['seconds'], options['write_share'],
+             options['posts'], number)
+            for number in range(options['workers'])
+        ]
+        # fork: воркерам нужны уже загруженные настройки Django.
+        context = multiprocessing.get_context('fork')
+        with context.Pool(options['workers']) as pool:
+            results = pool.map(worker, tasks)
+        total = {'reads': [], 'writes': [], 'errors': 0}
+        for result in results:
+            total['reads'] += result['reads']
+            total['writes'] += result['writes']
+            total['errors'] += result['errors']
+        return total
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        self.stdout.write(
+            f'{"":<10}{"reads/s":>10}{"writes/s":>10}{"errors":>8}'
+            f'{"read p95":>11}{"write p95":>11}')
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, description in MODES:
+                total = self.run(mode, directory, options)
+                reads = sorted(total['reads'])
+                writes = sorted(total['writes'])
+                read_p95 = percentile(reads, 95) or 0
+                write_p95 = percentile(writes, 95) or 0
+                self.stdout.write(
+                    f'{mode:<10}{len(reads) / seconds:>10.0f}'
+                    f'{len(writes) / seconds:>10.0f}{total["errors"]:>8}'
+                    f'{read_p95 * 1000:>9.1f}ms{write_p95 * 1000:>9.1f}ms'
+                    f'  ({description})'
+                )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = ('Печатает подписанное значение заголовка X-Profile: запрос с '
+            'ним профилируется независимо от PROFILING_SAMPLE_RATE. '
+            'Токен действует сутки.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.make_token())
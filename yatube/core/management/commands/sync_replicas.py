@@ -0,0 +1,58 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+# Страниц за шаг backup: между шагами основная база доступна писателям.
+BACKUP_PAGES: int = 1024
+
+
+def copy_database(source, target, pages=BACKUP_PAGES):
+    """Согласованный снимок файла SQLite source в target (backup API)."""
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst, pages=pages)
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS. С --interval повторяет копирование, '
+            'изображая асинхронную репликацию с задержкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Копировать каждые N секунд до Ctrl+C.')
+
+    def targets(self):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('DATABASE_REPLICAS пуст, задайте '
+                               'YATUBE_REPLICAS.')
+        for alias in replicas:
+            replica = settings.DATABASES[alias]
+            if 'sqlite3' not in replica['ENGINE']:
+                raise CommandError(f'{alias}: поддерживается только SQLite.')
+            if replica['NAME'] == primary['NAME']:
+                raise CommandError(f'{alias}: файл совпадает с основным.')
+        return primary['NAME'], [
+            (alias, settings.DATABASES[alias]['NAME']) for alias in replicas
+        ]
+
+    def sync(self, source, targets):
+        for alias, target in targets:
+            start = time.perf_counter()
+            copy_database(source, target)
+            self.stdout.write(
+                f'{alias}: {(time.perf_counter() - start) * 1000:.0f} мс')
+
+    def handle(self, *args, **options):
+        source, targets = self.targets()
+        interval = options['interval']
+        self.sync(source, targets)
+        while interval:
+            time.sleep(interval)
+            self.sync(source, targets)
@@ -0,0 +1,328 @@
+"""Метрики Prometheus, общие для всех процессов сервера.
+
+Каждый процесс пишет свои счетчики в собственный файл METRICS_DIR/<pid>.db,
+отображенный в память (mmap): увеличение счетчика - запись восьми байт
+без системных вызовов и без блокировок между процессами. /metrics
+читает и складывает файлы всех процессов, поэтому чтение ничего не
+сбрасывает, а значения завершившихся воркеров продолжают учитываться:
+новый процесс при старте переносит их файлы в свой, и файлов в каталоге
+не больше, чем живых процессов.
+
+Формат файла: в начале 8 байт - занятый объем, дальше записи
+[длина ключа: uint32][ключ в UTF-8, выровненный до 8 байт][float64].
+Ключ - имя метрики и метки в формате Prometheus, разделенные '\\0'.
+"""
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+INITIAL_SIZE: int = 64 * 1024
+HEADER = struct.Struct('Q')
+KEY_LENGTH = struct.Struct('I')
+VALUE = struct.Struct('d')
+# Границы корзин гистограмм длительности, секунды.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                    5.0, 10.0)
+INF = float('inf')
+HISTOGRAM_SUFFIXES = ('bucket', 'sum', 'count')
+
+# Имя -> (тип, описание) для строк # TYPE и # HELP.
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса по view.'),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы по view и базе.'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время SQL-запросов по view и базе.'),
+    'yatube_template_render_seconds': (
+        'histogram', 'Время рендера шаблона страницы.'),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кэшам по результату hit/miss.'),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий кэша.'),
+    'yatube_ratelimit_requests_total': (
+        'counter', 'Проверки ограничения частоты по view и результату.'),
+}
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR',
+                   os.path.join(settings.BASE_DIR, 'metrics'))
+
+
+def escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{escape(value)}"'
+                    for name, value in labels.items())
+
+
+def format_bound(bound):
+    return '+Inf' if bound == INF else repr(bound)
+
+
+def padding(length):
+    """Выравнивание, чтобы значение float64 лежало по границе 8 байт."""
+    return -(KEY_LENGTH.size + length) % 8
+
+
+def read_entries(data):
+    """Пары ключ, значение из содержимого файла процесса."""
+    used = HEADER.unpack_from(data, 0)[0]
+    offset = HEADER.size
+    while offset < used:
+        length = KEY_LENGTH.unpack_from(data, offset)[0]
+        offset += KEY_LENGTH.size
+        key = bytes(data[offset:offset + length]).decode()
+        offset += length + padding(length)
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        offset += VALUE.size
+
+
+class ProcessFile:
+    """Счетчики одного процесса в файле, отображенном в память."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.file = os.fdopen(fd, 'r+b')
+        size = os.fstat(fd).st_size
+        if size < INITIAL_SIZE:
+            self.file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self.map = mmap.mmap(fd, size)
+        if HEADER.unpack_from(self.map, 0)[0] == 0:
+            HEADER.pack_into(self.map, 0, HEADER.size)
+        self.offsets = {key: offset
+                        for key, _, offset in read_entries(self.map)}
+
+    def _append(self, key):
+        data = key.encode()
+        entry = (KEY_LENGTH.pack(len(data)) + data
+                 + b'\0' * padding(len(data)) + VALUE.pack(0.0))
+        used = HEADER.unpack_from(self.map, 0)[0]
+        if used + len(entry) > len(self.map):
+            self._grow(used + len(entry))
+        self.map[used:used + len(entry)] = entry
+        # Занятый объем пишется последним: читатель не увидит запись
+        # раньше, чем она записана целиком.
+        HEADER.pack_into(self.map, 0, used + len(entry))
+        offset = used + len(entry) - VALUE.size
+        self.offsets[key] = offset
+        return offset
+
+    def _grow(self, needed):
+        size = len(self.map)
+        while size < needed:
+            size *= 2
+        self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            offset = self.offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            value = VALUE.unpack_from(self.map, offset)[0]
+            VALUE.pack_into(self.map, offset, value + amount)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_dead(directory, process):
+    """Переносит счетчики завершившихся процессов в файл process.
+
+    Файл забирается переименованием: из нескольких стартующих воркеров
+    его получит один, и значения не учтутся дважды.
+    """
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension != '.db' or not stem.isdigit() or alive(int(stem)):
+            continue
+        path = os.path.join(directory, name)
+        claimed = f'{path}.{os.getpid()}.merging'
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        with open(claimed, 'rb') as file:
+            data = file.read()
+        if len(data) >= HEADER.size:
+            for key, value, _ in read_entries(data):
+                process.inc(key, value)
+        os.remove(claimed)
+
+
+class Registry:
+    """Файл текущего процесса; после fork открывается новый."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.file = None
+
+    def current(self):
+        pid = os.getpid()
+        if self.pid != pid:
+            with self.lock:
+                if self.pid != pid:
+                    directory = metrics_dir()
+                    os.makedirs(directory, exist_ok=True)
+                    self.file = ProcessFile(
+                        os.path.join(directory, f'{pid}.db'))
+                    merge_dead(directory, self.file)
+                    self.pid = pid
+        return self.file
+
+    def reset(self):
+        with self.lock:
+            if self.file is not None and self.pid == os.getpid():
+                self.file.close()
+            self.pid = self.file = None
+
+
+registry = Registry()
+
+
+@receiver(setting_changed)
+def metrics_dir_changed(setting, **kwargs):
+    if setting == 'METRICS_DIR':
+        registry.reset()
+
+
+def inc(name, labels, amount=1.0):
+    registry.current().inc(f'{name}\0{format_labels(labels)}', amount)
+
+
+def observe(name, labels, value):
+    """Наблюдение гистограммы: корзина, сумма и число наблюдений.
+
+    Корзины хранятся не накопленными, накопление делает render.
+    """
+    bound = next((bound for bound in DURATION_BUCKETS if value <= bound),
+                 INF)
+    process = registry.current()
+    prefix = format_labels(labels)
+    separator = ',' if prefix else ''
+    process.inc(f'{name}_bucket\0{prefix}{separator}'
+                f'le="{format_bound(bound)}"')
+    process.inc(f'{name}_sum\0{prefix}', value)
+    process.inc(f'{name}_count\0{prefix}')
+
+
+def collect():
+    """Сумма значений по всем файлам процессов: ключ -> значение."""
+    directory = metrics_dir()
+    totals = defaultdict(float)
+    if not os.path.isdir(directory):
+        return totals
+    for name in os.listdir(directory):
+        if not name.endswith('.db'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            continue
+        if len(data) < HEADER.size:
+            continue
+        for key, value, _ in read_entries(data):
+            totals[key] += value
+    return totals
+
+
+def cumulative_buckets(samples):
+    """Накопленные корзины гистограмм, как требует формат Prometheus."""
+    groups = defaultdict(list)
+    for key, value in samples.items():
+        sample, _, labels = key.partition('\0')
+        if not sample.endswith('_bucket'):
+            continue
+        head, _, bound = labels.rpartition('le="')
+        bound = float(bound.rstrip('"'))
+        groups[(sample, head.rstrip(','))].append((bound, value))
+    result = {}
+    for (sample, head), values in groups.items():
+        present = dict(values)
+        total = 0.0
+        for bound in DURATION_BUCKETS + (INF,):
+            total += present.get(bound, 0.0)
+            separator = ',' if head else ''
+            result[f'{sample}\0{head}{separator}'
+                   f'le="{format_bound(bound)}"'] = total
+    return result
+
+
+def metric_name(sample):
+    """Имя метрики по имени строки: x_bucket, x_sum, x_count -> x."""
+    base, _, suffix = sample.rpartition('_')
+    if suffix in HISTOGRAM_SUFFIXES and METRICS.get(base, ('',))[0] == (
+            'histogram'):
+        return base
+    return sample
+
+
+def sort_key(item):
+    sample, labels, _ = item
+    head, _, bound = labels.partition('le="')
+    return sample, head, float(bound.rstrip('"')) if bound else 0.0
+
+
+def hit_ratios(samples):
+    """Доли попаданий по счетчикам yatube_cache_requests_total."""
+    totals = defaultdict(lambda: {'hit': 0.0, 'miss': 0.0})
+    for key, value in samples.items():
+        sample, _, labels = key.partition('\0')
+        if sample != 'yatube_cache_requests_total':
+            continue
+        head, _, result = labels.rpartition(',result="')
+        totals[head][result.rstrip('"')] = value
+    return {
+        f'yatube_cache_hit_ratio\0{head}':
+            counts['hit'] / (counts['hit'] + counts['miss'])
+        for head, counts in totals.items()
+        if counts['hit'] + counts['miss']
+    }
+
+
+def render():
+    """Текст для /metrics в формате Prometheus."""
+    samples = collect()
+    samples.update(cumulative_buckets(samples))
+    samples.update(hit_ratios(samples))
+    by_metric = defaultdict(list)
+    for key, value in samples.items():
+        sample, _, labels = key.partition('\0')
+        by_metric[metric_name(sample)].append((sample, labels, value))
+    lines = []
+    for metric in sorted(by_metric):
+        kind, description = METRICS.get(metric, ('untyped', ''))
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for sample, labels, value in sorted(by_metric[metric], key=sort_key):
+            labels = f'{{{labels}}}' if labels else ''
+            lines.append(f'{sample}{labels} {value!r}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,223 @@
+import cProfile
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, profiling, ratelimit, routers, views
+
+logger = logging.getLogger(__name__)
+
+REPLICA_STICKY_COOKIE = 'use_primary'
+REPLICA_STICKY_SECONDS: int = 10
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class QueryBudgetExceeded(Exception):
+    """View выполнил больше SQL-запросов, чем разрешено QUERY_BUDGETS."""
+
+
+class QueryStats:
+    """Счетчик SQL-запросов, подключаемый через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+        self.aliases = Counter()
+        self.alias_time = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            alias = context['connection'].alias
+            self.time += elapsed
+            self.count += 1
+            self.aliases[alias] += 1
+            self.alias_time[alias] += elapsed
+            self.statements[sql] += 1
+            self.executions[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """Сколько раз повторился тот же запрос с теми же параметрами."""
+        return sum(n - 1 for n in self.executions.values() if n > 1)
+
+    @property
+    def similar(self):
+        """Повторы одного SQL с разными параметрами - типичный признак N+1."""
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы, время SQL и дубли для каждого view.
+
+    Результат лежит в request.query_stats. Если view превысил бюджет из
+    settings.QUERY_BUDGETS, пишется предупреждение, а при
+    QUERY_BUDGET_STRICT = True выбрасывается QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        view_name = get_view_name(request)
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and stats.count > budget:
+            message = (
+                f'{view_name}: {stats.count} SQL-запросов при бюджете '
+                f'{budget} (дублей {stats.duplicates}, '
+                f'похожих {stats.similar}, {stats.time * 1000:.1f} мс, '
+                f'по базам {dict(stats.aliases)})'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        if getattr(settings, 'QUERY_STATS_HEADERS', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={stats.time * 1000:.2f};'
+                f'desc="{stats.count} queries"',
+                *(
+                    f'db-{alias};dur={stats.alias_time[alias] * 1000:.2f};'
+                    f'desc="{count} queries"'
+                    for alias, count in sorted(stats.aliases.items())
+                ),
+            ])
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Читать из основной базы после записи (read-your-writes).
+
+    Изменяющий запрос и любой запрос, записавший в базу, ставят cookie
+    на REPLICA_STICKY_SECONDS. Пока cookie жива, все чтения этого
+    клиента идут в основную базу, а не на отстающую реплику.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        primary = (request.method not in SAFE_METHODS
+                   or REPLICA_STICKY_COOKIE in request.COOKIES)
+        with routers.request_state(primary) as state:
+            response = self.get_response(request)
+        if state['wrote'] or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS',
+                                REPLICA_STICKY_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует выборку запросов cProfile, см. core.profiling.
+
+    Запрос профилируется с вероятностью PROFILING_SAMPLE_RATE или при
+    верно подписанном заголовке X-Profile. Для остальных запросов цена -
+    одно случайное число и поиск заголовка.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def sampled(self, request):
+        token = request.META.get(profiling.PROFILE_HEADER)
+        if token is not None:
+            return profiling.valid_token(token)
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE',
+                       profiling.PROFILING_SAMPLE_RATE)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В потоке уже работает другой профилировщик.
+            return self.get_response(request)
+        sampler = profiling.StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            stacks = sampler.stop()
+        try:
+            profiling.save_profile(profiler, stacks, get_view_name(request))
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса')
+        return response
+
+
+class MetricsMiddleware:
+    """Длительность запроса и SQL-запросы по view для /metrics.
+
+    Стоит перед QueryBudgetMiddleware и берет из него request.query_stats.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        view = get_view_name(request) or 'unresolved'
+        metrics.observe('yatube_request_duration_seconds', {'view': view},
+                        time.perf_counter() - start)
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            for alias, count in stats.aliases.items():
+                labels = {'view': view, 'alias': alias}
+                metrics.inc('yatube_db_queries_total', labels, count)
+                metrics.inc('yatube_db_query_seconds_total', labels,
+                            stats.alias_time[alias])
+        return response
+
+
+class RateLimitMiddleware:
+    """Применяет правила settings.RATE_LIMITS по имени view.
+
+    Стоит после AuthenticationMiddleware: ведро пользователя берется
+    из request.user. См. core.ratelimit.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = get_view_name(request)
+        rule = getattr(settings, 'RATE_LIMITS', {}).get(view_name)
+        if rule is None:
+            return None
+        retry_after = ratelimit.check(request, view_name, rule)
+        if retry_after:
+            return views.too_many_requests(request, retry_after)
+        return None
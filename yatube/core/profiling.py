@@ -0,0 +1,127 @@
+"""Профилирование отдельных запросов cProfile на боевом сервере.
+
+ProfilingMiddleware профилирует долю PROFILING_SAMPLE_RATE запросов и
+запросы с заголовком X-Profile, подписанным SECRET_KEY (токен печатает
+команда profile_token). Для каждого такого запроса в
+PROFILING_DIR/<view>/ пишутся файл .prof для pstats/snakeviz и файл
+.collapsed в формате flamegraph.pl (число снятых стеков); старые файлы
+вида удаляются, хранится PROFILING_KEEP последних. Сводку по видам
+строит команда aggregate_profiles.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+PROFILING_SAMPLE_RATE: float = 0.0
+PROFILING_KEEP: int = 100
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'core.profiling'
+TOKEN_MAX_AGE: int = 24 * 60 * 60
+# Период семплирования стеков для .collapsed, секунды.
+STACK_INTERVAL: float = 0.001
+
+
+def profiling_dir():
+    return getattr(settings, 'PROFILING_DIR',
+                   os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(uuid.uuid4().hex)
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def view_directory(view_name):
+    """Каталог вида: posts:profile -> PROFILING_DIR/posts.profile."""
+    name = re.sub(r'[^\w.-]', '.', view_name or 'unresolved')
+    return os.path.join(profiling_dir(), name)
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return (f'{code.co_name} '
+            f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока запроса раз в interval секунд.
+
+    cProfile хранит только пары вызывающий -> вызываемый, а flamegraph
+    нужны целые стеки, поэтому их дает отдельный поток-семплер, который
+    работает только пока профилируется запрос.
+    """
+
+    def __init__(self, thread_id, interval=STACK_INTERVAL):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+
+def write_collapsed(stacks, path):
+    with open(path, 'w') as file:
+        for stack, value in sorted(stacks.items()):
+            file.write(f'{stack} {value}\n')
+
+
+def read_collapsed(path):
+    stacks = Counter()
+    with open(path) as file:
+        for line in file:
+            stack, _, value = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[stack] += int(value)
+    return stacks
+
+
+def save_profile(profiler, stacks, view_name):
+    """Пишет .prof и .collapsed запроса и удаляет старые файлы вида."""
+    directory = view_directory(view_name)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(
+        directory, f'{time.time():.6f}-{os.getpid()}-{uuid.uuid4().hex[:6]}')
+    profiler.dump_stats(base + '.prof')
+    write_collapsed(stacks, base + '.collapsed')
+    rotate(directory, getattr(settings, 'PROFILING_KEEP', PROFILING_KEEP))
+
+
+def rotate(directory, keep):
+    names = sorted(name[:-len('.prof')] for name in os.listdir(directory)
+                   if name.endswith('.prof'))
+    for name in names[:-keep] if keep else names:
+        for suffix in ('.prof', '.collapsed'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
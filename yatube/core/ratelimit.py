@@ -0,0 +1,109 @@
+"""Ограничение частоты изменяющих запросов (token bucket).
+
+Ведро на пару (view, пользователь) и на пару (view, IP) хранится в общем
+кэше одним целым числом - теоретическим временем прихода следующего
+запроса в миллисекундах (алгоритм GCRA). Это тот же token bucket: N
+токенов, которые пополняются со скоростью N за период, но запрос
+обновляет ведро одной атомарной операцией incr, без чтения и записи под
+блокировкой. Отказ возвращает токен обратно.
+
+Правила задаются настройкой RATE_LIMITS по имени view (их применяет
+RateLimitMiddleware) или декоратором rate_limit:
+
+    {'user': '30/m', 'ip': '120/m', 'methods': ['POST']}
+
+'N/s', 'N/m', 'N/h', 'N/d' - N запросов подряд и столько же за период.
+Без methods учитываются все методы. Превышение - ответ 429 с
+Retry-After.
+"""
+import functools
+import math
+import time
+
+from django.core.cache import cache
+
+from . import metrics
+from .views import too_many_requests
+
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+PREFIX = 'ratelimit:'
+# Время жизни ведра в периодах с момента создания, сброса или отказа.
+# Истекшее ведро снова полное: лишних токенов не больше N за это время.
+BUCKET_TIMEOUT_PERIODS: int = 10
+
+
+def parse_rate(rate):
+    """'30/m' -> (30, 60): число запросов и период в секундах."""
+    count, _, unit = rate.partition('/')
+    return int(count), RATE_UNITS[unit]
+
+
+def hit(key, rate, now=None):
+    """Берет токен из ведра key; 0 или секунды до следующего токена."""
+    count, period = parse_rate(rate)
+    interval = max(period * 1000 // count, 1)
+    capacity = count * interval
+    now = int((time.time() if now is None else now) * 1000)
+    key = PREFIX + key
+    timeout = period * BUCKET_TIMEOUT_PERIODS
+    try:
+        arrival = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, timeout):
+            return 0
+        arrival = cache.incr(key, interval)
+    if arrival - interval < now:
+        # Ведро успело наполниться: отсчет заново от текущего момента.
+        # Гонка двух таких запросов дает не больше лишнего токена.
+        cache.set(key, now + interval, timeout)
+        return 0
+    if arrival - now <= capacity:
+        return 0
+    cache.incr(key, -interval)
+    cache.touch(key, timeout)
+    return max(math.ceil((arrival - capacity - now) / 1000), 1)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def buckets(request, scope, rule):
+    """Пары (вид ключа, ключ ведра, скорость) для запроса."""
+    if 'user' in rule and request.user.is_authenticated:
+        yield 'user', f'{scope}:user:{request.user.pk}', rule['user']
+    if 'ip' in rule:
+        yield 'ip', f'{scope}:ip:{client_ip(request)}', rule['ip']
+
+
+def check(request, scope, rule):
+    """0, если запрос проходит, иначе секунды для Retry-After."""
+    methods = rule.get('methods')
+    if methods is not None and request.method not in methods:
+        return 0
+    for kind, key, rate in buckets(request, scope, rule):
+        retry_after = hit(key, rate)
+        metrics.inc('yatube_ratelimit_requests_total', {
+            'view': scope, 'key': kind,
+            'result': 'limited' if retry_after else 'allowed',
+        })
+        if retry_after:
+            return retry_after
+    return 0
+
+
+def rate_limit(scope=None, **rule):
+    """Декоратор view с правилом из аргументов: user, ip, methods."""
+    def decorator(view):
+        name = scope or f'{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            retry_after = check(request, name, rule)
+            if retry_after:
+                return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,71 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS; без них все запросы
+идут в default. Запросы с изменением (POST и т. п.) и запросы в течение
+REPLICA_STICKY_SECONDS после них читают из основной базы, чтобы
+пользователь сразу видел свой пост или комментарий, даже если реплика
+еще не догнала основную базу (см. ReplicaStickinessMiddleware).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сессии читаются сразу после записи при входе, реплика может отстать.
+PRIMARY_ONLY_APPS = ('sessions',)
+
+# Состояние текущего запроса: {'primary': bool, 'wrote': bool} или None.
+_state = ContextVar('replica_state', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def request_state(primary):
+    """Состояние маршрутизации на время одного запроса."""
+    state = {'primary': primary, 'wrote': False}
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    state = _state.get()
+    with request_state(True) as inner:
+        yield
+    if state is not None:
+        state['wrote'] = state['wrote'] or inner['wrote']
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (not replicas() or model._meta.app_label in PRIMARY_ONLY_APPS
+                or state is not None and state['primary']
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными через sync_replicas.
+        if db in replicas():
+            return False
+        return None
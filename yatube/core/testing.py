@@ -0,0 +1,34 @@
+"""Запуск тестов без следов в рабочем дереве.
+
+TestRunner подставляет на весь прогон временные MEDIA_ROOT, METRICS_DIR,
+PROFILING_DIR и отдельный файл кэша: загрузки, миниатюры, счетчики и
+профили из тестов не попадают в рабочее дерево, а cache.clear() в
+тестах не стирает кэш запущенного сайта.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_dir = tempfile.mkdtemp(prefix='yatube-tests-')
+        cache = dict(settings.CACHES['default'])
+        cache['LOCATION'] = os.path.join(self.temp_dir, 'cache.sqlite3')
+        self.test_settings = override_settings(
+            MEDIA_ROOT=os.path.join(self.temp_dir, 'media'),
+            METRICS_DIR=os.path.join(self.temp_dir, 'metrics'),
+            PROFILING_DIR=os.path.join(self.temp_dir, 'profiles'),
+            CACHES={'default': cache},
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
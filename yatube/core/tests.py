@@ -1,4 +1,32 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import closing
+from io import StringIO
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post, User
+
+from . import metrics, profiling, ratelimit, views
+from .cache import SQLiteCache
+from .db import retry_on_locked
+from .management.commands.sync_replicas import copy_database
+from .middleware import (REPLICA_STICKY_COOKIE, QueryBudgetExceeded,
+                         QueryStats, ReplicaStickinessMiddleware)
+from .routers import ReplicaRouter, use_primary
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +34,379 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def test_stats_recorded(self):
+        response = self.client.get('/')
+        stats = response.wsgi_request.query_stats
+        self.assertGreater(stats.count, 0)
+        self.assertGreaterEqual(stats.time, 0)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0},
+                       QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/')
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.cache.set('text', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('text'), {'a': [1, 2]})
+        self.assertFalse(self.cache.add('text', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.set_many({'x': 1, 'y': 'два'})
+        self.assertEqual(self.cache.get_many(['x', 'y', 'missing']),
+                         {'x': 1, 'y': 'два'})
+        self.cache.delete_many(['x', 'y'])
+        self.assertIsNone(self.cache.get('x'))
+        self.cache.set('gone', 1, timeout=-1)
+        self.assertFalse(self.cache.has_key('gone'))
+
+    def test_shared_between_instances(self):
+        """Второй экземпляр (как другой процесс) видит те же данные."""
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+
+    def test_incr_is_atomic(self):
+        self.cache.set('counter', 0)
+        threads = [
+            threading.Thread(target=lambda: [
+                self.make_cache().incr('counter') for _ in range(50)
+            ])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_culled(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        for number in range(4):
+            cache.set(number, number)
+            cache.connection.execute(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                (number, cache.make_key(number)),
+            )
+        cache.get(0)
+        cache.set('new', 'value')
+        self.assertEqual(
+            cache.get_many([0, 1, 2, 3, 'new']),
+            {0: 0, 3: 3, 'new': 'value'},
+        )
+
+    def test_reads_defer_access_time(self):
+        """Чтение не пишет в файл, время доступа уходит с записью."""
+        self.cache.set('key', 'value')
+        select = 'SELECT accessed FROM cache_entry WHERE key = ?'
+        key = self.cache.make_key('key')
+        self.cache.connection.execute(
+            'UPDATE cache_entry SET accessed = 0 WHERE key = ?', (key,))
+        self.cache.get('key')
+        self.assertEqual(
+            self.cache.connection.execute(select, (key,)).fetchone()[0], 0)
+        self.cache.set('other', 'value')
+        self.assertGreater(
+            self.cache.connection.execute(select, (key,)).fetchone()[0], 0)
+
+    def test_size_limit(self):
+        cache = self.make_cache(MAX_SIZE=1000)
+        for number in range(10):
+            cache.set(number, 'x' * 300)
+        used = cache.connection.execute(
+            'SELECT bytes FROM cache_stats').fetchone()[0]
+        self.assertLessEqual(used, 1000)
+
+
+class SQLiteSetupTest(TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        # 1 - NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_transaction_begins_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                self.pragma('user_version')
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+class RetryOnLockedTest(SimpleTestCase):
+    def test_retries_until_success(self):
+        func = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'done'])
+        func.__qualname__ = 'func'
+        self.assertEqual(retry_on_locked(func, delay=0)(), 'done')
+        self.assertEqual(func.call_count, 2)
+
+    def test_other_errors_and_last_attempt_raise(self):
+        cases = (
+            ([OperationalError('no such table: x')], 1),
+            ([OperationalError('database is locked')] * 3, 3),
+        )
+        for errors, calls in cases:
+            with self.subTest(error=str(errors[0])):
+                func = mock.Mock(side_effect=errors)
+                func.__qualname__ = 'func'
+                with self.assertRaises(OperationalError):
+                    retry_on_locked(func, attempts=3, delay=0)()
+                self.assertEqual(func.call_count, calls)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_db_during(self, request):
+        """Куда пошло бы чтение поста внутри обработки request."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(view)(request)
+        return seen[0], response
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_request_sticks_to_primary(self):
+        alias, response = self.read_db_during(self.factory.post('/'))
+        self.assertEqual(alias, 'default')
+        self.assertIn(REPLICA_STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_STICKY_COOKIE] = '1'
+        alias, _ = self.read_db_during(request)
+        self.assertEqual(alias, 'default')
+        alias, response = self.read_db_during(self.factory.get('/'))
+        self.assertEqual(alias, 'replica1')
+        self.assertNotIn(REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_queries_counted_per_alias(self):
+        stats = QueryStats()
+        for alias in ('default', 'replica1', 'replica1'):
+            context = {'connection': mock.Mock(alias=alias)}
+            stats(lambda *args: None, 'SELECT 1', (), False, context)
+        self.assertEqual(stats.aliases, {'default': 1, 'replica1': 2})
+
+    def test_copy_database(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with closing(sqlite3.connect(source)) as conn, conn:
+            conn.execute('CREATE TABLE post (text TEXT)')
+            conn.execute("INSERT INTO post VALUES ('новый')")
+        copy_database(source, target)
+        with closing(sqlite3.connect(target)) as conn:
+            self.assertEqual(
+                conn.execute('SELECT text FROM post').fetchall(),
+                [('новый',)])
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.view_directory = os.path.join(self.directory, 'posts.index')
+
+    def profiles(self):
+        if not os.path.isdir(self.view_directory):
+            return []
+        return sorted(name for name in os.listdir(self.view_directory)
+                      if name.endswith('.prof'))
+
+    def test_not_sampled_by_default(self):
+        with self.settings(PROFILING_DIR=self.directory):
+            self.client.get('/', HTTP_X_PROFILE='forged')
+        self.assertEqual(self.profiles(), [])
+
+    def test_signed_header_profiles_request(self):
+        with self.settings(PROFILING_DIR=self.directory):
+            self.client.get('/', HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(len(self.profiles()), 1)
+        name = self.profiles()[0][:-len('.prof')]
+        self.assertTrue(os.path.exists(
+            os.path.join(self.view_directory, name + '.collapsed')))
+
+    def test_sampling_with_rotation(self):
+        with self.settings(PROFILING_DIR=self.directory,
+                           PROFILING_SAMPLE_RATE=1, PROFILING_KEEP=2):
+            for _ in range(3):
+                self.client.get('/')
+        self.assertEqual(len(self.profiles()), 2)
+        self.assertEqual(
+            len(os.listdir(self.view_directory)), 4)
+
+    def test_aggregate_profiles(self):
+        with self.settings(PROFILING_DIR=self.directory,
+                           PROFILING_SAMPLE_RATE=1):
+            self.client.get('/')
+            self.client.get('/')
+            out = StringIO()
+            call_command('aggregate_profiles', 'posts:index',
+                         collapsed=self.directory, stdout=out)
+        self.assertIn('posts.index: запросов 2', out.getvalue())
+        self.assertIn('(index)', out.getvalue())
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, 'posts.index.collapsed')))
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = self.settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_process_files_are_summed(self):
+        """Файлы разных процессов складываются, значения переживают
+        повторное открытие и рост файла."""
+        first = metrics.ProcessFile(os.path.join(self.directory, '1.db'))
+        second = metrics.ProcessFile(os.path.join(self.directory, '2.db'))
+        first.inc('hits\0', 2)
+        second.inc('hits\0', 3)
+        for number in range(5000):
+            first.inc(f'key\0n="{number}"')
+        first.close()
+        reopened = metrics.ProcessFile(os.path.join(self.directory, '1.db'))
+        reopened.inc('hits\0')
+        reopened.close()
+        second.close()
+        totals = metrics.collect()
+        self.assertEqual(totals['hits\0'], 6)
+        self.assertEqual(totals['key\0n="4999"'], 1)
+
+    def test_dead_process_files_are_merged(self):
+        """Файл завершившегося процесса переносится в файл нового."""
+        child = subprocess.Popen([sys.executable, '-c', ''])
+        child.wait()
+        dead = metrics.ProcessFile(
+            os.path.join(self.directory, f'{child.pid}.db'))
+        dead.inc('hits\0', 2)
+        dead.close()
+        metrics.registry.reset()
+        metrics.inc('hits', {})
+        self.assertEqual(os.listdir(self.directory), [f'{os.getpid()}.db'])
+        self.assertEqual(metrics.collect()['hits\0'], 3)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/')
+        self.client.get('/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'],
+                         views.METRICS_CONTENT_TYPE)
+        text = response.content.decode()
+        for line in (
+            'yatube_request_duration_seconds_count{view="posts:index"} 2.0',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2.0',
+            'yatube_template_render_seconds_count'
+            '{template="posts/index.html"} 2.0',
+            'yatube_cache_hit_ratio{cache="index_page"} 0.5',
+            '# TYPE yatube_db_queries_total counter',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def test_metrics_only_for_allowed_ips(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response.status_code, 404)
+
+
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = self.settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_bucket_allows_burst_and_refills(self):
+        hits = [ratelimit.hit('bucket', '3/m', now=100) for _ in range(4)]
+        self.assertEqual(hits, [0, 0, 0, 20])
+        # Отказ не расходует токен: через 20 с пополнился ровно один.
+        self.assertEqual(ratelimit.hit('bucket', '3/m', now=120), 0)
+        self.assertEqual(ratelimit.hit('bucket', '3/m', now=120), 20)
+        # После простоя ведро снова полное.
+        self.assertEqual(
+            [ratelimit.hit('bucket', '3/m', now=1000) for _ in range(4)],
+            [0, 0, 0, 20])
+
+    @override_settings(RATE_LIMITS={
+        'posts:add_comment': {'user': '2/m', 'ip': '100/m',
+                              'methods': ['POST']},
+    })
+    def test_middleware_limits_per_user(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='text')
+        url = f'/posts/{post.pk}/comment/'
+        self.client.force_login(author)
+        codes = [self.client.post(url, {'text': 'hi'}).status_code
+                 for _ in range(3)]
+        self.assertEqual(codes, [302, 302, 429])
+        response = self.client.post(url, {'text': 'hi'})
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(post.comments.count(), 2)
+        # GET не учитывается, у другого пользователя свое ведро.
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user(username='other'))
+        self.assertEqual(self.client.post(url, {'text': 'hi'}).status_code,
+                         302)
+        totals = metrics.collect()
+        key = ('yatube_ratelimit_requests_total\0'
+               'view="posts:add_comment",key="user",result="{}"')
+        self.assertEqual(totals[key.format('allowed')], 3)
+        self.assertEqual(totals[key.format('limited')], 2)
+
+    @override_settings(RATE_LIMITS={'users:signup': {'ip': '1/h'}})
+    def test_middleware_limits_per_ip(self):
+        self.assertEqual(self.client.get('/auth/signup/').status_code, 200)
+        response = self.client.get('/auth/signup/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.get(
+            '/auth/signup/', REMOTE_ADDR='192.0.2.1').status_code, 200)
+
+    def test_decorator(self):
+        view = ratelimit.rate_limit('decorated', ip='1/s')(
+            lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+        self.assertEqual(view(request).status_code, 200)
+        response = view(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
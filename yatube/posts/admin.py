@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Follow, Comment
 
 
@@ -11,6 +12,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс, а не LIKE."""
+        if not search_term or not search.fts_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        if not search.build_match(search_term):
+            return queryset.none(), False
+        return search.filter_matching(queryset, search_term), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
@@ -0,0 +1,201 @@
+"""Версионированный кэш фрагментов лент.
+
+Каждая лента (главная, группа, профиль) имеет область (scope) с токеном
+версии в кэше. Ключ фрагмента включает токен и страницу/курсор, поэтому
+при изменении поста достаточно сменить токен затронутых областей:
+старые фрагменты больше не читаются и вытесняются сами. Токены случайные,
+а не счетчики, чтобы версия не совпала со старой после очистки кэша.
+
+Те же токены служат валидаторами условных GET-запросов: ETag страницы
+меняется вместе с версиями областей, из которых она собрана.
+
+Токен каждой области включает версию GLOBAL_SCOPE: массовая загрузка
+данных сбрасывает все области сменой одного ключа.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.middleware.csrf import get_token
+from django.utils.http import quote_etag
+
+from core import metrics
+
+FEED_CACHE_TIMEOUT: int = 60 * 60 * 24
+VERSION_PREFIX = 'feed_version:'
+
+INDEX_SCOPE = 'index'
+GLOBAL_SCOPE = 'global'
+FRAGMENTS = ('index_page', 'group_page', 'profile_page', 'post_card')
+CARD_PREFIX = 'post_card:'
+METRIC_RESULTS = {'hits': 'hit', 'misses': 'miss'}
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follow_scope(user_id):
+    """Подписчики и подписки пользователя (счетчики и кнопка в профиле)."""
+    return f'follow:{user_id}'
+
+
+def recommendations_scope(user_id):
+    """Блок "кого почитать" для пользователя на его страницах."""
+    return f'recommendations:{user_id}'
+
+
+def post_scopes(post, *group_ids):
+    """Области лент и страница поста, где он показывается."""
+    scopes = {INDEX_SCOPE, profile_scope(post.author_id)}
+    if post.pk is not None:
+        scopes.add(post_scope(post.pk))
+    for group_id in (post.group_id, *group_ids):
+        if group_id is not None:
+            scopes.add(group_scope(group_id))
+    return scopes
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def _stored(key):
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, _new_token(), None)
+        token = cache.get(key)
+    return token
+
+
+def versions(*scopes):
+    """Токены нескольких областей одним обращением к кэшу."""
+    keys = [VERSION_PREFIX + scope for scope in (GLOBAL_SCOPE, *scopes)]
+    tokens = cache.get_many(keys)
+    epoch, *tokens = [
+        tokens[key] if key in tokens else _stored(key) for key in keys
+    ]
+    return [epoch + token for token in tokens]
+
+
+def version(scope):
+    return versions(scope)[0]
+
+
+def csrf_secret(request):
+    """CSRF-cookie, которую получит клиент вместе с этой страницей.
+
+    get_token создает cookie, если ее еще нет, поэтому ETag первого
+    ответа совпадет со следующим запросом того же клиента.
+    """
+    get_token(request)
+    return request.META.get('CSRF_COOKIE', '')
+
+
+def etag(request, *scopes):
+    """ETag страницы, собранной из перечисленных областей.
+
+    Кроме версий областей учитывает все, что отличает страницу для
+    разных посетителей: пользователя (форма комментария, кнопки
+    редактирования и подписки), CSRF-токен в формах и адрес с
+    параметрами страницы.
+    """
+    user = request.user
+    parts = [
+        *versions(*scopes),
+        str(user.pk) if user.is_authenticated else '',
+        csrf_secret(request),
+        request.get_full_path(),
+    ]
+    return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def bump(*scopes):
+    """Инвалидирует все фрагменты перечисленных областей."""
+    cache.set_many(
+        {VERSION_PREFIX + scope: _new_token() for scope in scopes}, None
+    )
+
+
+def _count(name, outcome, delta=1):
+    # Счетчик в метриках процесса (mmap), а не в кэше: попадание не
+    # должно брать блокировку записи файла кэша, общего для воркеров.
+    metrics.inc('yatube_cache_requests_total',
+                {'cache': name, 'result': METRIC_RESULTS[outcome]}, delta)
+
+
+def fragment(name, scope, vary_on, render):
+    """Возвращает фрагмент из кэша или рендерит и сохраняет его."""
+    key = make_template_fragment_key(name, [version(scope), *vary_on])
+    value = cache.get(key)
+    if value is not None:
+        _count(name, 'hits')
+        return value
+    _count(name, 'misses')
+    value = render()
+    cache.set(key, value, FEED_CACHE_TIMEOUT)
+    return value
+
+
+def card_key(post, token):
+    """Ключ карточки: пост, версия его области и чужие поля карточки.
+
+    Имя и логин автора и slug группы хранятся не в посте, поэтому
+    входят в ключ сами: после их смены карточка рендерится заново.
+    """
+    author = post.author
+    shown = [author.username, author.get_full_name(),
+             post.group.slug if post.group_id is not None else '']
+    digest = hashlib.md5('|'.join(shown).encode()).hexdigest()
+    return f'{CARD_PREFIX}{post.pk}:{token}:{digest}'
+
+
+def cards(posts, render):
+    """HTML карточек постов; промахи рендерятся и сохраняются.
+
+    Карточка одинакова для всех посетителей, а ключ включает версию
+    области поста, поэтому правка, комментарий или готовая миниатюра
+    сбрасывают только ее. Кэш читается и пишется пачкой на страницу.
+    """
+    posts = list(posts)
+    tokens = versions(*(post_scope(post.pk) for post in posts))
+    keys = [card_key(post, token) for post, token in zip(posts, tokens)]
+    cached = cache.get_many(keys)
+    rendered = {
+        key: render(post)
+        for post, key in zip(posts, keys) if key not in cached
+    }
+    if rendered:
+        cache.set_many(rendered, FEED_CACHE_TIMEOUT)
+        _count('post_card', 'misses', len(rendered))
+    if cached:
+        _count('post_card', 'hits', len(cached))
+    return [
+        cached[key] if key in cached else rendered[key] for key in keys
+    ]
+
+
+def stats(names=FRAGMENTS):
+    """Счетчики попаданий и промахов по именам фрагментов.
+
+    Сумма по метрикам всех процессов сервера, см. core.metrics.
+    """
+    samples = metrics.collect()
+    return {
+        name: {
+            outcome: int(samples.get(
+                'yatube_cache_requests_total\0' + metrics.format_labels(
+                    {'cache': name, 'result': result}), 0))
+            for outcome, result in METRIC_RESULTS.items()
+        }
+        for name in names
+    }
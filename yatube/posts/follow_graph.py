@@ -0,0 +1,119 @@
+"""Граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id (array):
+на кого он подписан и кто подписан на него. "Подписан ли A на B" -
+двоичный поиск, число подписчиков - длина массива, без запросов к базе.
+
+Массивы грузятся лениво, одним запросом на пользователя, и кладутся в
+общий кэш (для других процессов) и в LRU текущего процесса. Ключ
+включает токен области feed_cache.follow_scope, которую подписка и
+отписка сбрасывают для обоих пользователей (signals.follow_changed),
+так что устаревший массив больше не читается.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from . import feed_cache
+from .models import Follow
+
+# Ограничение LRU процесса по сумме длин массивов, а не по их числу:
+# пользователи с тысячами подписок занимают пропорционально больше.
+GRAPH_MAX_IDS: int = 2_000_000
+GRAPH_CACHE_TIMEOUT: int = 60 * 60 * 24
+CACHE_PREFIX = 'follow_graph:'
+TYPECODE = 'q'
+# Направление -> (поле, по которому выбираются строки, поле-результат).
+DIRECTIONS = {
+    'following': ('user_id', 'author_id'),
+    'followers': ('author_id', 'user_id'),
+}
+
+
+class LocalGraph:
+    """LRU массивов процесса: (направление, id) -> (токен, массив)."""
+
+    def __init__(self, max_ids=GRAPH_MAX_IDS):
+        self.max_ids = max_ids
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key, token):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != token:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, token, ids):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (token, ids)
+            self.size += len(ids)
+            while self.size > self.max_ids and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+local = LocalGraph()
+
+
+def _load(direction, user_id):
+    field, column = DIRECTIONS[direction]
+    return array(TYPECODE, Follow.objects.filter(
+        **{field: user_id}
+    ).order_by(column).values_list(column, flat=True))
+
+
+def _ids(direction, user_id):
+    token = feed_cache.version(feed_cache.follow_scope(user_id))
+    key = (direction, user_id)
+    ids = local.get(key, token)
+    if ids is not None:
+        return ids
+    cache_key = f'{CACHE_PREFIX}{direction}:{user_id}:{token}'
+    data = cache.get(cache_key)
+    if data is not None:
+        ids = array(TYPECODE)
+        ids.frombytes(data)
+    else:
+        ids = _load(direction, user_id)
+        cache.set(cache_key, ids.tobytes(), GRAPH_CACHE_TIMEOUT)
+    local.put(key, token, ids)
+    return ids
+
+
+def following(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь."""
+    return _ids('following', user_id)
+
+
+def followers(author_id):
+    """Отсортированные id подписчиков автора."""
+    return _ids('followers', author_id)
+
+
+def follows(user_id, author_id):
+    ids = following(user_id)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def follower_count(author_id):
+    return len(followers(author_id))
+
+
+def following_count(user_id):
+    return len(following(user_id))
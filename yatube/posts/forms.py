@@ -1,5 +1,7 @@
 from django import forms
+from django.db import transaction
 
+from . import thumbnails
 from .models import Post, Comment
 
 
@@ -14,6 +16,13 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Вы обязательно должны ввести текст!')
         return data
 
+    def save(self, commit=True):
+        post = super().save(commit)
+        if commit and post.image and 'image' in self.changed_data:
+            name = post.image.name
+            transaction.on_commit(lambda: thumbnails.schedule(name))
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,70 @@
+"""Нормализация картинок постов при загрузке.
+
+Оригинал с телефона может весить десятки мегабайт, хранить GPS в EXIF и
+декодироваться заново для каждой миниатюры. Перед сохранением JPEG и PNG
+уменьшаются до MAX_IMAGE_SIDE, поворачиваются по EXIF и пережимаются без
+метаданных. JPEG декодируется сразу в уменьшенном масштабе (draft), так
+что полный кадр в память не попадает. Остальные форматы, например
+анимированные GIF, сохраняются как есть.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+MAX_IMAGE_SIDE: int = 1920
+JPEG_QUALITY: int = 85
+NORMALIZED_FORMATS = ('JPEG', 'PNG')
+
+
+def save_options(image_format):
+    # PNG без явного exif берет его из info исходной картинки.
+    if image_format == 'JPEG':
+        return {'quality': JPEG_QUALITY, 'optimize': True,
+                'progressive': True, 'exif': b''}
+    return {'optimize': True, 'exif': b''}
+
+
+def fitted_size(size, max_side):
+    width, height = size
+    ratio = min(max_side / width, max_side / height, 1)
+    return max(round(width * ratio), 1), max(round(height * ratio), 1)
+
+
+def normalize(upload, max_side=MAX_IMAGE_SIDE):
+    """Возвращает уменьшенную копию картинки без метаданных.
+
+    upload - загруженный файл с атрибутом name. Если формат не
+    поддерживается или картинку не удалось прочитать, возвращается
+    upload без изменений: проверку содержимого делает ImageField.
+    """
+    try:
+        upload.seek(0)
+        image = Image.open(upload)
+        image_format = image.format
+        if image_format not in NORMALIZED_FORMATS:
+            return upload
+        if image_format == 'JPEG':
+            # Декодер JPEG умеет масштабы 1/2, 1/4 и 1/8: draft выбирает
+            # самый мелкий, который не меньше итогового размера.
+            image.draft('RGB', fitted_size(image.size, max_side))
+        icc_profile = image.info.get('icc_profile')
+        # thumbnail сначала сжимает картинку быстрым reduce() в целое
+        # число раз и только потом применяет точный фильтр. Поворот по
+        # EXIF делается уже на маленькой копии: exif_transpose копирует
+        # картинку целиком. Рамка квадратная, поэтому порядок не важен.
+        image.thumbnail((max_side, max_side), Image.LANCZOS,
+                        reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        options = save_options(image_format)
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        image.save(buffer, image_format, **options)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        upload.seek(0)
+        return upload
+    return ContentFile(buffer.getvalue(), name=os.path.basename(upload.name))
@@ -0,0 +1,54 @@
+"""Общие помощники команд массовой загрузки данных."""
+import gzip
+import sys
+from contextlib import contextmanager, nullcontext
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Позволяет bulk_create сохранить заданные pub_date.
+
+    Иначе auto_now_add перезапишет их текущим временем, и у всех
+    созданных записей будет одна и та же дата.
+    """
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def keyset_batches(queryset, size):
+    """Обход queryset по возрастанию pk пачками, без OFFSET.
+
+    Память ограничена размером пачки независимо от размера таблицы.
+    """
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        batch = list(page[:size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+        last_pk = last['pk'] if isinstance(last, dict) else last.pk
+
+
+def open_stream(path, mode, compress=None):
+    """Открывает файл JSONL на чтение ('r') или запись ('w').
+
+    '-' означает stdin/stdout, gzip включается для *.gz или compress=True.
+    """
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        return nullcontext(stream)
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
@@ -0,0 +1,118 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from posts import feed_cache, follow_graph
+from posts.models import Follow, User
+
+BENCH_PREFIX = 'bench_follow_graph_'
+# SQLite ограничивает число строк в одном INSERT ... SELECT.
+BATCH_SIZE: int = 500
+
+
+def db_follows(user_id, author_id):
+    """Прежняя проверка подписки в profile."""
+    return Follow.objects.filter(user_id=user_id, author_id=author_id).exists()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запросы к Follow с графом подписок в памяти на '
+            'читателях, подписанных на тысячи авторов. Данные создаются '
+            'во временной транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=5000)
+        parser.add_argument('--readers', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def measure(self, func, repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = time.perf_counter() - start
+        return len(captured) / repeat, elapsed / repeat * 1000
+
+    def create_users(self, count, kind):
+        User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}{kind}_{number}', password='!')
+            for number in range(count)
+        ], batch_size=BATCH_SIZE)
+        return list(User.objects.filter(
+            username__startswith=f'{BENCH_PREFIX}{kind}_'
+        ).values_list('pk', flat=True))
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        repeat = options['repeat']
+        user_ids = []
+        try:
+            with transaction.atomic():
+                authors = self.create_users(options['authors'], 'author')
+                readers = self.create_users(options['readers'], 'reader')
+                user_ids = authors + readers
+                Follow.objects.bulk_create([
+                    Follow(user_id=reader, author_id=author)
+                    for reader in readers for author in authors
+                ], batch_size=BATCH_SIZE)
+                feed_cache.bump(
+                    *(feed_cache.follow_scope(pk) for pk in user_ids))
+                self.run(rnd, readers, authors + readers, repeat)
+                transaction.set_rollback(True)
+        finally:
+            # Id откаченных пользователей достанутся новым: их графы
+            # в кэше не должны читаться.
+            feed_cache.bump(*(feed_cache.follow_scope(pk) for pk in user_ids))
+            follow_graph.local.clear()
+
+    def run(self, rnd, readers, candidates, repeat):
+        popular = candidates[0]
+
+        def pair():
+            return rnd.choice(readers), rnd.choice(candidates)
+
+        def cold(func):
+            def wrapper():
+                follow_graph.local.clear()
+                feed_cache.bump(feed_cache.follow_scope(readers[0]),
+                                feed_cache.follow_scope(popular))
+                func()
+            return wrapper
+
+        cases = [
+            ('follows (A -> B)',
+             lambda: db_follows(*pair()),
+             lambda: follow_graph.follows(*pair())),
+            ('following of A',
+             lambda: list(Follow.objects.filter(
+                 user_id=rnd.choice(readers)).values_list(
+                 'author_id', flat=True)),
+             lambda: follow_graph.following(rnd.choice(readers))),
+            ('follower count of B',
+             lambda: Follow.objects.filter(author_id=popular).count(),
+             lambda: follow_graph.follower_count(popular)),
+            ('cold: following of A',
+             lambda: list(Follow.objects.filter(
+                 user_id=readers[0]).values_list('author_id', flat=True)),
+             cold(lambda: follow_graph.following(readers[0]))),
+        ]
+        self.stdout.write(
+            f'{len(readers)} читателей x {len(candidates) - len(readers)} '
+            f'авторов, повторов: {repeat}'
+        )
+        self.stdout.write(f'{"case":<24}{"queries":>18}{"ms":>22}')
+        # Прогрев: теплые случаи меряют граф уже в памяти процесса.
+        for reader in readers:
+            follow_graph.following(reader)
+        follow_graph.followers(popular)
+        for name, database, graph in cases:
+            db_q, db_ms = self.measure(database, repeat)
+            graph_q, graph_ms = self.measure(graph, repeat)
+            self.stdout.write(
+                f'{name:<24}{db_q:>8.0f} -> {graph_q:<7.2f}'
+                f'{db_ms:>10.3f} -> {graph_ms:<8.3f}'
+            )
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Post
+from posts.utils import LAST_10_POSTS
+
+
+def touch_post(post):
+    """Обращается к тем же полям, что и post_card.html."""
+    post.author.get_full_name()
+    str(post.author)
+    if post.group:
+        post.group.slug
+
+
+def touch_comment(comment):
+    """Обращается к тем же полям, что и comment_create.html."""
+    comment.author.username
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает прежние ленивые querysets лент с for_feed/for_post '
+            'по числу SQL-запросов и времени на текущей базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=LAST_10_POSTS)
+
+    def measure(self, make_queryset, touch, repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for obj in make_queryset():
+                    touch(obj)
+            elapsed = time.perf_counter() - start
+        return len(captured) / repeat, elapsed / repeat * 1000
+
+    def handle(self, *args, **options):
+        repeat, size = options['repeat'], options['page_size']
+        cases = [
+            ('feed page', touch_post,
+             lambda: Post.objects.all()[:size],
+             lambda: Post.objects.for_feed()[:size]),
+        ]
+        post = Post.objects.annotate(
+            total=Count('comments')
+        ).order_by('-total').first()
+        if post is not None:
+            cases.append((
+                f'comments of post {post.pk}', touch_comment,
+                lambda: post.comments.all(),
+                lambda: Comment.objects.for_post(post),
+            ))
+        self.stdout.write(
+            f'{"case":<28}{"queries":>18}{"ms":>20}'
+        )
+        for name, touch, lazy, eager in cases:
+            lazy_q, lazy_ms = self.measure(lazy, touch, repeat)
+            eager_q, eager_ms = self.measure(eager, touch, repeat)
+            self.stdout.write(
+                f'{name:<28}{lazy_q:>8.0f} -> {eager_q:<7.0f}'
+                f'{lazy_ms:>10.2f} -> {eager_ms:<8.2f}'
+            )
@@ -0,0 +1,113 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.template.base import Template
+from django.test import Client
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.management.commands.load_test import REMOTE_ADDR
+from posts.models import Follow, Group, Post, User
+
+# Режимы прогона: что лежит в кэше перед каждым запросом.
+MODES = (
+    ('cold', 'пустой кэш'),
+    ('cards', 'лента сброшена, карточки в кэше'),
+    ('warm', 'все в кэше'),
+)
+
+
+@contextmanager
+def timed_templates():
+    """Замеряет время рендера каждого шаблона (включая вложенные).
+
+    Возвращает словарь имя шаблона -> список длительностей в секундах.
+    """
+    timings = defaultdict(list)
+    original = Template._render
+
+    def _render(self, context):
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            timings[self.origin.template_name or '<string>'].append(
+                time.perf_counter() - start)
+
+    Template._render = _render
+    try:
+        yield timings
+    finally:
+        Template._render = original
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время рендера шаблонов для каждой страницы ленты '
+            'при пустом кэше, сброшенных лентах и полном кэше.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def pages(self):
+        post = Post.objects.annotate(
+            total=Count('comments')).order_by('-total').first()
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        reader = Follow.objects.values_list('user', flat=True).first()
+        if post is None or group is None or reader is None:
+            raise CommandError(
+                'Нужны посты, группы и подписки, запустите seed_data.')
+        pages = {
+            'index': (reverse('posts:index'), [feed_cache.INDEX_SCOPE]),
+            'group_list': (
+                reverse('posts:group_list', args=(group.slug,)),
+                [feed_cache.group_scope(group.pk)],
+            ),
+            'profile': (
+                reverse('posts:profile', args=(post.author.username,)),
+                [feed_cache.profile_scope(post.author_id)],
+            ),
+            'post_detail': (
+                reverse('posts:post_detail', args=(post.pk,)),
+                [feed_cache.post_scope(post.pk)],
+            ),
+            'follow_index': (reverse('posts:follow_index'), []),
+        }
+        return pages, User.objects.get(pk=reader)
+
+    def prepare(self, mode, client, url, scopes):
+        """Приводит кэш в состояние режима mode перед замером."""
+        if mode == 'cold':
+            cache.clear()
+            return
+        client.get(url)
+        if mode == 'cards':
+            feed_cache.bump(*scopes)
+
+    def handle(self, *args, **options):
+        pages, reader = self.pages()
+        client = Client(REMOTE_ADDR=REMOTE_ADDR)
+        client.force_login(reader)
+        repeat = options['repeat']
+        for page, (url, scopes) in pages.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{page} {url}'))
+            for mode, description in MODES:
+                totals = defaultdict(list)
+                for _ in range(repeat):
+                    self.prepare(mode, client, url, scopes)
+                    with timed_templates() as timings:
+                        client.get(url)
+                    for name, durations in timings.items():
+                        totals[name].extend(durations)
+                self.stdout.write(f'  {mode} ({description}), на запрос:')
+                for name, durations in sorted(
+                    totals.items(), key=lambda item: -sum(item[1])
+                ):
+                    self.stdout.write(
+                        f'    {name:<40}{len(durations) / repeat:>6.1f} x '
+                        f'{sum(durations) / repeat * 1000:>8.2f} мс'
+                    )
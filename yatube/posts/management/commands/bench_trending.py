@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+from posts.management.commands.load_test import percentile
+from posts.models import Post
+
+# Бюджет записи счетчиков на один комментарий, мс.
+WRITE_BUDGET_MS: float = 1.0
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы счетчиков популярного на запись '
+            'комментария (add_comment). Счетчики пишутся в корзину '
+            'за пределами окна и не влияют на рейтинг.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+
+    def handle(self, *args, **options):
+        # Корзина на два окна раньше текущей: в рейтинг она не попадет,
+        # а счетчики истекут сами.
+        now = time.time() - 2 * trending.counter_timeout()
+        first, repeat = [], []
+        for number in range(options['comments']):
+            post = Post(pk=-(number % options['posts']) - 1,
+                        group_id=-(number % options['groups']) - 1)
+            start = time.perf_counter()
+            trending.record(post, trending.COMMENT_WEIGHT, now=now)
+            elapsed = (time.perf_counter() - start) * 1000
+            (first if number < options['posts'] else repeat).append(elapsed)
+        self.stdout.write(f'{"case":<28}{"mean ms":>10}{"p99 ms":>10}')
+        worst = 0.0
+        for name, samples in (('первый в корзине', first),
+                              ('повторный', repeat)):
+            if not samples:
+                continue
+            samples.sort()
+            p99 = percentile(samples, 99)
+            worst = max(worst, statistics.mean(samples))
+            self.stdout.write(
+                f'{name:<28}{statistics.mean(samples):>10.3f}{p99:>10.3f}')
+        style = (self.style.SUCCESS if worst < WRITE_BUDGET_MS
+                 else self.style.ERROR)
+        self.stdout.write(style(
+            f'Худшее среднее на комментарий: {worst:.3f} мс '
+            f'(бюджет {WRITE_BUDGET_MS} мс)'
+        ))
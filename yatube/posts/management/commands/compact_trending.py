@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Собирает снимок популярных постов и групп из счетчиков '
+            'активности. Запускается по расписанию чаще, чем истекает '
+            'снимок (TRENDING_SNAPSHOT_TIMEOUT).')
+
+    def handle(self, *args, **options):
+        trending.compact()
+        self.stdout.write(self.style.SUCCESS('Снимок популярного обновлен'))
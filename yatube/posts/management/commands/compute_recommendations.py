@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации "кого почитать" по графу подписок. '
+            'Запускается по расписанию; с --stale - только для '
+            'пользователей, чьи подписки изменились.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Пересчитать только помеченных пользователей.'
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=recommendations.RECOMMENDATIONS_TOP_K
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=recommendations.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['stale']:
+            user_ids = recommendations.stale_user_ids()
+        start = time.perf_counter()
+        users, rows = recommendations.refresh(
+            user_ids, options['top_k'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}, рекомендаций: {rows} '
+            f'за {time.perf_counter() - start:.2f} с'
+        ))
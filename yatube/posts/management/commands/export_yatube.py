@@ -0,0 +1,98 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.management.bulk import keyset_batches, open_stream
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE: int = 2000
+PROGRESS_EVERY: int = 100000
+
+# Что выгружается для каждой модели. Связи записаны естественными
+# ключами (username, slug) или исходным id поста, чтобы import_yatube
+# мог переназначить их в другой базе. Порядок моделей важен: записи
+# выгружаются после тех, на кого ссылаются.
+EXPORTS = (
+    ('user', User.objects.all(), {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+        'password': 'password',
+        'is_active': 'is_active',
+        'date_joined': 'date_joined',
+    }),
+    ('group', Group.objects.all(), {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    ('post', Post.objects.all(), {
+        'id': 'pk',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    }),
+    ('comment', Comment.objects.all(), {
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'pub_date': 'pub_date',
+    }),
+    ('follow', Follow.objects.all(), {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+)
+
+
+class Encoder(DjangoJSONEncoder):
+    """Даты без потери микросекунд, в отличие от DjangoJSONEncoder."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def records(batch_size):
+    """Генератор строк выгрузки: в памяти не больше одной пачки."""
+    for model, queryset, fields in EXPORTS:
+        rows = queryset.values('pk', *set(fields.values()) - {'pk'})
+        for batch in keyset_batches(rows, batch_size):
+            for row in batch:
+                yield model, {name: row[source]
+                              for name, source in fields.items()}
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает пользователей, группы, посты, комментарии '
+            'и подписки в JSONL (со сжатием gzip для *.gz).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки или '-' для stdout.")
+        parser.add_argument('--gzip', action='store_true', default=None,
+                            help='Сжимать выгрузку независимо от имени.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        encoder = Encoder(ensure_ascii=False)
+        counts, total = {}, 0
+        start = time.perf_counter()
+        with open_stream(options['path'], 'w', options['gzip']) as stream:
+            for model, fields in records(options['batch_size']):
+                stream.write(encoder.encode(
+                    {'model': model, 'fields': fields}) + '\n')
+                counts[model] = counts.get(model, 0) + 1
+                total += 1
+                if total % PROGRESS_EVERY == 0:
+                    self.stderr.write(
+                        f'Выгружено {total} записей '
+                        f'за {time.perf_counter() - start:.0f} с')
+        self.stderr.write(self.style.SUCCESS(
+            'Выгружено: ' + json.dumps(counts, ensure_ascii=False)))
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша лент по фрагментам.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(feed_cache.stats(), indent=2))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+BATCH_SIZE: int = 500
+
+
+class Command(BaseCommand):
+    help = ('Создает миниатюры всех размеров из шаблонов для картинок '
+            'постов, у которых их еще нет.')
+
+    def missing(self, name):
+        return any(
+            thumbnails.lookup(name, geometry, **options) is None
+            for geometry, options in thumbnails.THUMBNAIL_SIZES
+        )
+
+    def images(self):
+        """Картинки постов пачками по pk, без OFFSET."""
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk).exclude(image='')
+                .order_by('pk').values_list('pk', 'image')[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            for pk, name in batch:
+                yield name
+            last_pk = batch[-1][0]
+
+    def handle(self, *args, **options):
+        queued = 0
+        for name in self.images():
+            if self.missing(name):
+                thumbnails.workers.submit(name)
+                queued += 1
+        thumbnails.workers.join()
+        self.stdout.write(
+            self.style.SUCCESS(f'Поставлено в очередь картинок: {queued}')
+        )
@@ -0,0 +1,255 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from posts import feed_cache
+from posts.management.bulk import explicit_dates, open_stream
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE: int = 2000
+PROGRESS_EVERY: int = 100000
+KEY_CACHE_SIZE: int = 100000
+# Ограничение SQLite на число параметров в одном запросе.
+LOOKUP_CHUNK: int = 500
+
+
+class KeyMap:
+    """Естественный ключ -> pk с ограниченным LRU-кэшем.
+
+    Ключи, которых нет в кэше, ищутся одним запросом на пачку, поэтому
+    память не растет с числом пользователей и групп в выгрузке.
+    """
+
+    def __init__(self, model, field, size=KEY_CACHE_SIZE):
+        self.model = model
+        self.field = field
+        self.size = size
+        self.cache = OrderedDict()
+
+    def resolve(self, keys):
+        found, missing = {}, []
+        for key in set(keys):
+            if key is None:
+                continue
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                found[key] = self.cache[key]
+            else:
+                missing.append(key)
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            found.update(self.model.objects.filter(
+                **{f'{self.field}__in': chunk}
+            ).values_list(self.field, 'pk'))
+        for key in missing:
+            if key in found:
+                self.cache[key] = found[key]
+        while len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+        return found
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает выгрузку export_yatube пачками bulk_create. '
+            'Пользователи и группы сопоставляются по username и slug, '
+            'id постов сдвигаются на текущий максимум (в пустой базе '
+            'сохраняются). После загрузки пересчитываются счетчики и '
+            'ленты подписок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки или '-' для stdin.")
+        parser.add_argument('--gzip', action='store_true', default=None,
+                            help='Читать как gzip независимо от имени.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--images',
+            help='Каталог MEDIA_ROOT исходной базы: картинки постов '
+                 'копируются в текущее хранилище. Без него сохраняются '
+                 'только имена файлов.')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Не пересчитывать счетчики и ленты.')
+
+    def handle(self, *args, **options):
+        self.images = options['images']
+        if self.images and not os.path.isdir(self.images):
+            raise CommandError(f'Каталог {self.images} не найден.')
+        self.users = KeyMap(User, 'username')
+        self.groups = KeyMap(Group, 'slug')
+        self.post_offset = Post.objects.aggregate(
+            last=Max('pk'))['last'] or 0
+        self.counts = {}
+        self.total = 0
+        self.start = time.perf_counter()
+        flush = {
+            'user': self.load_users,
+            'group': self.load_groups,
+            'post': self.load_posts,
+            'comment': self.load_comments,
+            'follow': self.load_follows,
+        }
+        batch_size = options['batch_size']
+        with open_stream(options['path'], 'r', options['gzip']) as stream, \
+                explicit_dates(Post, Comment):
+            model, batch = None, []
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    kind, fields = record['model'], record['fields']
+                    if kind not in flush:
+                        raise KeyError(kind)
+                except (ValueError, KeyError, TypeError) as error:
+                    raise CommandError(f'Строка {number}: {error!r}')
+                if batch and (kind != model or len(batch) >= batch_size):
+                    self.flush(flush[model], model, batch)
+                    batch = []
+                model = kind
+                batch.append(fields)
+            if batch:
+                self.flush(flush[model], model, batch)
+        self.stderr.write(self.style.SUCCESS(
+            'Загружено: ' + json.dumps(self.counts, ensure_ascii=False)))
+        if not options['skip_rebuild']:
+            # bulk_create не вызывает сигналы: счетчики, ленты подписок и
+            # кэш лент приводятся в порядок после загрузки.
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+            feed_cache.bump(feed_cache.GLOBAL_SCOPE)
+
+    def flush(self, load, model, batch):
+        with transaction.atomic():
+            created = load(batch)
+        self.counts[model] = self.counts.get(model, 0) + created
+        before, self.total = self.total, self.total + len(batch)
+        if self.total // PROGRESS_EVERY > before // PROGRESS_EVERY:
+            self.stderr.write(
+                f'Обработано {self.total} записей '
+                f'за {time.perf_counter() - self.start:.0f} с')
+
+    def load_users(self, batch):
+        # Уже существующие пропускает ignore_conflicts, в отчет идут
+        # только новые. Найденные заодно попадают в кэш ключей.
+        names = {fields['username'] for fields in batch}
+        created = len(names) - len(self.users.resolve(names))
+        User.objects.bulk_create([
+            User(
+                username=fields['username'],
+                first_name=fields.get('first_name', ''),
+                last_name=fields.get('last_name', ''),
+                email=fields.get('email', ''),
+                password=fields.get('password', ''),
+                is_active=fields.get('is_active', True),
+                date_joined=parse_datetime(fields['date_joined']),
+            )
+            for fields in batch
+        ], ignore_conflicts=True)
+        return created
+
+    def load_groups(self, batch):
+        slugs = {fields['slug'] for fields in batch}
+        created = len(slugs) - len(self.groups.resolve(slugs))
+        Group.objects.bulk_create([
+            Group(
+                slug=fields['slug'],
+                title=fields['title'],
+                description=fields.get('description', ''),
+            )
+            for fields in batch
+        ], ignore_conflicts=True)
+        return created
+
+    def load_posts(self, batch):
+        authors = self.users.resolve(fields['author'] for fields in batch)
+        groups = self.groups.resolve(fields['group'] for fields in batch)
+        posts = [
+            Post(
+                id=fields['id'] + self.post_offset,
+                author_id=authors[fields['author']],
+                group_id=groups.get(fields['group']),
+                text=fields['text'],
+                pub_date=parse_datetime(fields['pub_date']),
+                image=self.attach(fields.get('image') or ''),
+            )
+            for fields in batch
+            if fields['author'] in authors
+        ]
+        Post.objects.bulk_create(posts)
+        return len(posts)
+
+    def existing_posts(self, post_ids):
+        """Те из post_ids, что есть в базе: посты без автора пропущены."""
+        post_ids = list(set(post_ids))
+        found = set()
+        for start in range(0, len(post_ids), LOOKUP_CHUNK):
+            found.update(Post.objects.filter(
+                pk__in=post_ids[start:start + LOOKUP_CHUNK]
+            ).values_list('pk', flat=True))
+        return found
+
+    def existing_follows(self, pairs):
+        pairs = list(pairs)
+        found = set()
+        # Два списка IN на кусок: параметров не больше LOOKUP_CHUNK.
+        step = LOOKUP_CHUNK // 2
+        for start in range(0, len(pairs), step):
+            chunk = pairs[start:start + step]
+            found.update(Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in chunk},
+                author_id__in={author_id for _, author_id in chunk},
+            ).values_list('user_id', 'author_id'))
+        return found.intersection(pairs)
+
+    def load_comments(self, batch):
+        authors = self.users.resolve(fields['author'] for fields in batch)
+        posts = self.existing_posts(
+            fields['post'] + self.post_offset for fields in batch)
+        comments = [
+            Comment(
+                post_id=fields['post'] + self.post_offset,
+                author_id=authors[fields['author']],
+                text=fields['text'],
+                pub_date=parse_datetime(fields['pub_date']),
+            )
+            for fields in batch
+            if fields['author'] in authors
+            and fields['post'] + self.post_offset in posts
+        ]
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    def load_follows(self, batch):
+        users = self.users.resolve(
+            name for fields in batch
+            for name in (fields['user'], fields['author'])
+        )
+        pairs = {
+            (users[fields['user']], users[fields['author']])
+            for fields in batch
+            if fields['user'] in users and fields['author'] in users
+        }
+        pairs -= self.existing_follows(pairs)
+        Follow.objects.bulk_create([
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ], ignore_conflicts=True)
+        return len(pairs)
+
+    def attach(self, name):
+        """Копирует картинку из --images и возвращает имя в хранилище."""
+        if not name or not self.images:
+            return name
+        source = os.path.join(self.images, name)
+        if not os.path.isfile(source):
+            return ''
+        with open(source, 'rb') as file:
+            return default_storage.save(name, File(file))
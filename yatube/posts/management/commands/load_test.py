@@ -0,0 +1,241 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from faker import Faker
+
+from posts.models import Group, Post, User
+
+# Доли запросов к каждому адресу по умолчанию: чтение лент преобладает.
+REQUEST_MIX = {
+    'index': 30,
+    'group_list': 10,
+    'profile': 15,
+    'post_detail': 25,
+    'follow_index': 10,
+    'add_comment': 7,
+    'post_create': 3,
+}
+SAMPLE_SIZE: int = 1000
+PERCENTILES = (50, 95, 99)
+# Адрес не из INTERNAL_IPS, чтобы debug toolbar не искажал замеры.
+REMOTE_ADDR = '192.0.2.1'
+# У каждого потока свой адрес из той же сети, как у отдельного клиента.
+WORKER_ADDR = '192.0.2.{}'
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in REQUEST_MIX or not weight.isdigit():
+            raise CommandError(
+                f'Неверный элемент смеси "{item}", ожидается view=вес, '
+                f'view из {", ".join(REQUEST_MIX)}.'
+            )
+        mix[name] = int(weight)
+    return mix
+
+
+def percentile(ordered, share):
+    """Процентиль методом ближайшего ранга по отсортированному списку."""
+    if not ordered:
+        return None
+    index = math.ceil(share * len(ordered) / 100) - 1
+    return ordered[min(max(index, 0), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет смесь запросов ко всем страницам Yatube через '
+            'WSGI-приложение в несколько потоков и печатает JSON с '
+            'p50/p95/p99, пропускной способностью и числом SQL-запросов. '
+            'Данные для прогона создает команда seed_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=50,
+                            help='Запросов на прогрев, не входят в отчет.')
+        parser.add_argument(
+            '--mix', type=parse_mix, default=REQUEST_MIX,
+            help='Смесь запросов вида index=30,post_detail=20.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+        parser.add_argument(
+            '--rate-limits', action='store_true',
+            help='Не отключать RATE_LIMITS: несколько пользователей '
+                 'прогона быстро исчерпывают лимиты записи, и 429 '
+                 'считаются ошибками.')
+
+    def load_targets(self):
+        users = list(User.objects.filter(posts__isnull=False).distinct()
+                     .values_list('username', flat=True)[:SAMPLE_SIZE])
+        if not users:
+            raise CommandError('В базе нет постов, запустите seed_data.')
+        return {
+            'users': users,
+            'groups': list(Group.objects.values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+            'posts': list(Post.objects.values_list(
+                'pk', flat=True)[:SAMPLE_SIZE]),
+        }
+
+    def make_request(self, view, client, targets, rnd, fake):
+        if view == 'index':
+            page = rnd.choice((1, 1, 1, 2, 3))
+            return client.get(reverse('posts:index'), {'page': page})
+        if view == 'group_list':
+            if not targets['groups']:
+                return client.get(reverse('posts:index'))
+            return client.get(reverse(
+                'posts:group_list', args=(rnd.choice(targets['groups']),)))
+        if view == 'profile':
+            return client.get(reverse(
+                'posts:profile', args=(rnd.choice(targets['users']),)))
+        if view == 'post_detail':
+            return client.get(reverse(
+                'posts:post_detail', args=(rnd.choice(targets['posts']),)))
+        if view == 'follow_index':
+            return client.get(reverse('posts:follow_index'))
+        if view == 'add_comment':
+            return client.post(
+                reverse('posts:add_comment',
+                        args=(rnd.choice(targets['posts']),)),
+                {'text': fake.sentence()},
+            )
+        return client.post(
+            reverse('posts:post_create'),
+            {'text': fake.paragraph()},
+        )
+
+    def worker(self, number, requests, targets, seed, results):
+        rnd = random.Random(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        client = Client(REMOTE_ADDR=WORKER_ADDR.format(number % 254 + 1))
+        try:
+            client.force_login(
+                User.objects.get(username=rnd.choice(targets['users'])))
+        except Exception as error:
+            self.stderr.write(f'Не удалось войти: {error!r}')
+            # Запросы не отправлялись: это ошибки без времени ответа.
+            results.extend((view, None, None, None) for view in requests)
+            connections.close_all()
+            return
+        try:
+            for view in requests:
+                start = time.perf_counter()
+                try:
+                    response = self.make_request(
+                        view, client, targets, rnd, fake)
+                except Exception:
+                    results.append((view, time.perf_counter() - start,
+                                    None, None))
+                    continue
+                elapsed = time.perf_counter() - start
+                stats = getattr(response.wsgi_request, 'query_stats', None)
+                results.append((
+                    view, elapsed, stats.count if stats else None,
+                    response.status_code,
+                ))
+        finally:
+            connections.close_all()
+
+    def run(self, requests, threads, targets, seed):
+        results = []
+        chunks = [requests[number::threads] for number in range(threads)]
+        workers = [
+            threading.Thread(
+                target=self.worker,
+                args=(number, chunk, targets, (seed or 0) + number,
+                      results),
+            )
+            for number, chunk in enumerate(chunks)
+        ]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results, time.perf_counter() - start
+
+    def summarize(self, samples):
+        latencies = sorted(elapsed * 1000 for _, elapsed, _, _ in samples
+                           if elapsed is not None)
+        queries = [count for _, _, count, _ in samples if count is not None]
+        summary = {
+            'requests': len(samples),
+            'errors': sum(status is None or status >= 400
+                          for _, _, _, status in samples),
+            'rate_limited': sum(status == 429
+                                for _, _, _, status in samples),
+        }
+        if latencies:
+            summary['mean_ms'] = round(sum(latencies) / len(latencies), 2)
+            for share in PERCENTILES:
+                summary[f'p{share}_ms'] = round(
+                    percentile(latencies, share), 2)
+        if queries:
+            summary['queries_mean'] = round(sum(queries) / len(queries), 2)
+            summary['queries_max'] = max(queries)
+        return summary
+
+    def handle(self, *args, **options):
+        if options['rate_limits']:
+            return self.load(options)
+        # Замеряется скорость страниц, а не ограничитель: без отключения
+        # лимитов часть записей заканчивается ответом 429.
+        with override_settings(RATE_LIMITS={}):
+            return self.load(options)
+
+    def load(self, options):
+        rnd = random.Random(options['seed'])
+        mix = options['mix']
+        targets = self.load_targets()
+        views, weights = list(mix), list(mix.values())
+        threads = max(options['threads'], 1)
+        if options['warmup']:
+            self.run(rnd.choices(views, weights, k=options['warmup']),
+                     threads, targets, options['seed'])
+        results, duration = self.run(
+            rnd.choices(views, weights, k=options['requests']),
+            threads, targets, options['seed'],
+        )
+        by_view = defaultdict(list)
+        for sample in results:
+            by_view[sample[0]].append(sample)
+        report = {
+            'config': {
+                'requests': options['requests'],
+                'threads': threads,
+                'mix': mix,
+                'seed': options['seed'],
+                'debug': settings.DEBUG,
+                'database': settings.DATABASES['default']['ENGINE'],
+                'cache': settings.CACHES['default']['BACKEND'],
+                'rate_limits': options['rate_limits'],
+            },
+            'total': {
+                **self.summarize(results),
+                'duration_s': round(duration, 3),
+                'throughput_rps': round(len(results) / duration, 2),
+            },
+            'views': {
+                view: self.summarize(by_view[view])
+                for view in sorted(by_view)
+            },
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
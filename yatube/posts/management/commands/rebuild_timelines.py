@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию '
+                 'все, у кого есть подписки).'
+        )
+        parser.add_argument(
+            '--length', type=int, default=timeline.TIMELINE_LENGTH,
+            help='Сколько последних постов хранить в ленте.'
+        )
+        parser.add_argument(
+            '--trim', action='store_true',
+            help='Не пересобирать, а только обрезать ленты длиннее '
+                 '--length (публикация поста их не обрезает).'
+        )
+
+    def handle(self, *args, **options):
+        if options['trim']:
+            trimmed = timeline.trim_overflow(options['length'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Обрезано лент: {trimmed}')
+            )
+            return
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            user_ids = list(users.values_list('pk', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Часть пользователей не найдена.')
+        else:
+            user_ids = Follow.objects.values_list(
+                'user_id', flat=True
+            ).distinct().order_by('user_id')
+        rebuilt = 0
+        for user_id in user_ids:
+            timeline.rebuild(user_id, options['length'])
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE: int = 1000
+
+
+def counts_by(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(
+            field).annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+class Command(BaseCommand):
+    help = ('Сверяет денормализованные счетчики с реальными данными '
+            'и исправляет расхождения пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def batches(self, queryset, size):
+        """Обход таблицы по возрастанию pk без OFFSET."""
+        last_pk = None
+        while True:
+            page = queryset.order_by('pk')
+            if last_pk is not None:
+                page = page.filter(pk__gt=last_pk)
+            batch = list(page[:size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1].pk
+
+    def reconcile_posts(self, size):
+        fixed = 0
+        for batch in self.batches(Post.objects.only('comment_count'), size):
+            ids = [post.pk for post in batch]
+            actual = counts_by(Comment.objects, 'post', ids)
+            changed = []
+            for post in batch:
+                total = actual.get(post.pk, 0)
+                if post.comment_count != total:
+                    post.comment_count = total
+                    changed.append(post)
+            with transaction.atomic():
+                Post.objects.bulk_update(changed, ['comment_count'])
+            fixed += len(changed)
+        return fixed
+
+    def create_missing(self, size):
+        """Строки счетчиков для пользователей из bulk_create.
+
+        Создаются нулевыми, реальные значения выставляет reconcile_users.
+        """
+        created = 0
+        while True:
+            ids = list(User.objects.filter(stats__isnull=True).order_by(
+                'pk').values_list('pk', flat=True)[:size])
+            if not ids:
+                return created
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=pk) for pk in ids], ignore_conflicts=True)
+            created += len(ids)
+
+    def reconcile_users(self, size):
+        fixed = 0
+        for batch in self.batches(UserStats.objects.all(), size):
+            ids = [stats.pk for stats in batch]
+            actual = {
+                'post_count': counts_by(Post.objects, 'author', ids),
+                'follower_count': counts_by(Follow.objects, 'author', ids),
+                'following_count': counts_by(Follow.objects, 'user', ids),
+            }
+            changed = []
+            for stats in batch:
+                dirty = False
+                for field, totals in actual.items():
+                    total = totals.get(stats.pk, 0)
+                    if getattr(stats, field) != total:
+                        setattr(stats, field, total)
+                        dirty = True
+                if dirty:
+                    changed.append(stats)
+            with transaction.atomic():
+                UserStats.objects.bulk_update(changed, list(actual))
+            fixed += len(changed)
+        return fixed
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        posts = self.reconcile_posts(size)
+        self.create_missing(size)
+        users = self.reconcile_users(size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {posts}, пользователей: {users}'
+        ))
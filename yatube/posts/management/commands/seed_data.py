@@ -0,0 +1,169 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts import feed_cache
+from posts.management.bulk import explicit_dates
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+BATCH_SIZE: int = 1000
+SEED_PASSWORD = 'yatube-seed'
+# Показатель степени в законе Ципфа для популярности авторов: немногие
+# авторы собирают большую часть подписчиков, постов и комментариев.
+ZIPF_EXPONENT: float = 1.1
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу тестовыми пользователями, группами, постами, '
+            'комментариями и подписками с неравномерным графом подписок. '
+            f'Пароль всех пользователей: {SEED_PASSWORD}.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней растянуть даты постов.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def bulk(self, model, objects, **kwargs):
+        for start in range(0, len(objects), self.batch_size):
+            model.objects.bulk_create(
+                objects[start:start + self.batch_size], **kwargs)
+
+    def new_ids(self, model, last_pk):
+        """pk созданных записей: bulk_create на SQLite их не возвращает."""
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def last_pk(self, model):
+        return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    def create_users(self, count):
+        last_pk = self.last_pk(User)
+        password = make_password(SEED_PASSWORD)
+        users = [
+            User(
+                username=f'{self.fake.user_name()}_{last_pk + number}'[:150],
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+            )
+            for number in range(1, count + 1)
+        ]
+        self.bulk(User, users)
+        ids = self.new_ids(User, last_pk)
+        self.bulk(UserStats, [UserStats(user_id=pk) for pk in ids])
+        return ids
+
+    def create_groups(self, count):
+        last_pk = self.last_pk(Group)
+        self.bulk(Group, [
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'seed-{last_pk + number}',
+                description=self.fake.paragraph(),
+            )
+            for number in range(1, count + 1)
+        ])
+        return self.new_ids(Group, last_pk)
+
+    def create_posts(self, count, authors, groups, days):
+        last_pk = self.last_pk(Post)
+        now = timezone.now()
+        weights = zipf_weights(len(authors))
+        dates = sorted(
+            now - timedelta(seconds=self.random.uniform(0, days * 86400))
+            for _ in range(count)
+        )
+        posts = [
+            Post(
+                author_id=author_id,
+                group_id=(self.random.choice(groups)
+                          if groups and self.random.random() < 0.7 else None),
+                text=self.fake.paragraph(nb_sentences=5),
+                pub_date=pub_date,
+            )
+            for author_id, pub_date in zip(
+                self.random.choices(authors, weights, k=count), dates)
+        ]
+        self.bulk(Post, posts)
+        return list(Post.objects.filter(pk__gt=last_pk).values_list(
+            'pk', 'pub_date'))
+
+    def create_comments(self, count, posts, users):
+        now = timezone.now()
+        # Свежие посты комментируют чаще старых.
+        posts = sorted(posts, key=lambda post: post[1], reverse=True)
+        comments = []
+        for (post_id, pub_date), author_id in zip(
+            self.random.choices(posts, zipf_weights(len(posts), 0.8),
+                                k=count),
+            self.random.choices(users, k=count),
+        ):
+            delay = self.random.uniform(0, (now - pub_date).total_seconds())
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=self.fake.sentence(),
+                pub_date=pub_date + timedelta(seconds=delay),
+            ))
+        self.bulk(Comment, comments)
+
+    def create_follows(self, average, users):
+        weights = zipf_weights(len(users))
+        follows = []
+        for user_id in users:
+            count = min(int(self.random.expovariate(1 / average)) + 1,
+                        len(users) - 1)
+            authors = set(self.random.choices(users, weights, k=count))
+            authors.discard(user_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+        self.bulk(Follow, follows, ignore_conflicts=True)
+        return len(follows)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic(), explicit_dates(Post, Comment):
+            users = self.create_users(options['users'])
+            # Популярность не зависит от порядка создания.
+            self.random.shuffle(users)
+            groups = self.create_groups(options['groups'])
+            posts = self.create_posts(
+                options['posts'], users, groups, options['days'])
+            if posts:
+                self.create_comments(options['comments'], posts, users)
+            follows = self.create_follows(options['follows'], users)
+        # bulk_create не вызывает сигналы: счетчики, ленты подписок и
+        # кэш лент приводятся в порядок отдельно.
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        feed_cache.bump(feed_cache.GLOBAL_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, групп: {len(groups)}, '
+            f'постов: {len(posts)}, подписок: до {follows}'
+        ))
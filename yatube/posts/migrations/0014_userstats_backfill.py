@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def counts_by(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(
+            field).annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+def create_missing_stats(apps, schema_editor):
+    """Строки счетчиков для пользователей, у которых их еще нет."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    while True:
+        ids = list(User.objects.filter(stats__isnull=True).order_by(
+            'pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        posts = counts_by(Post.objects, 'author', ids)
+        followers = counts_by(Follow.objects, 'author', ids)
+        following = counts_by(Follow.objects, 'user', ids)
+        UserStats.objects.bulk_create([
+            UserStats(
+                user_id=pk,
+                post_count=posts.get(pk, 0),
+                follower_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            for pk in ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_recommendation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:49
+
+from django.db import migrations, models
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_userstats_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(blank=True, help_text='Комментарий к посту', null=True, on_delete=posts.models.cascade_comments, related_name='comments', to='posts.Post', verbose_name='Комментарий'),
+        ),
+    ]
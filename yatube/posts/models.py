@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
+
+from . import images
 
 User = get_user_model()
 TEXT_LEN: int = 15
@@ -14,6 +17,17 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним JOIN, без описания группы."""
+        return self.select_related('author', 'group').defer(
+            'group__description'
+        )
+
+    def for_detail(self):
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -41,18 +55,73 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_LEN]
 
+    def save(self, *args, **kwargs):
+        # comment_count меняют только атомарные UPDATE из сигналов,
+        # поэтому при редактировании поста его устаревшее значение
+        # не записывается.
+        if not self._state.adding and not kwargs.get('update_fields'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        # Новая картинка (еще не записанная в хранилище) уменьшается и
+        # очищается от метаданных до сохранения, какой бы путь ее ни принес:
+        # форма, админка или API.
+        if self.image and not self.image._committed:
+            self.image = images.normalize(self.image.file)
+        super().save(*args, **kwargs)
+
+
+def cascade_comments(collector, field, sub_objs, using):
+    """CASCADE, помечающий комментарии удаляемого поста.
+
+    Сигнал удаления комментария по метке не пересчитывает пост, который
+    удаляется вместе с ним, - иначе удаление поста стоит запросов на
+    каждый комментарий.
+    """
+    for comment in sub_objs:
+        comment.deleted_with_post = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_post(self, post):
+        """Комментарии поста вместе с авторами."""
+        return self.filter(post=post).select_related('author')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
-        on_delete=models.CASCADE,
+        on_delete=cascade_comments,
         blank=True,
         null=True,
         related_name='comments',
@@ -73,8 +142,16 @@ class Comment(models.Model):
                                     verbose_name='Дата публикации',
                                     db_index=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_LEN]
@@ -93,3 +170,151 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Подписки'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    def for_feed(self, user):
+        """Лента подписок пользователя с постами, авторами и группами."""
+        return self.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).defer('post__group__description')
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару (читатель, пост).
+
+    Заполняется при публикации поста (fan-out on write) и при подписке,
+    поэтому follow_index читает один диапазон индекса (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class UserStatsQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Счетчики пользователя.
+
+        Строку создает сигнал при регистрации пользователя, дальше ее
+        поддерживают сигналы, а расхождения чинит reconcile_counters.
+        Пользователям из bulk_create она создается здесь по реальным
+        агрегатам.
+        """
+        try:
+            return self.get(user=user)
+        except self.model.DoesNotExist:
+            stats, _ = self.get_or_create(user=user, defaults={
+                'post_count': Post.objects.filter(author=user).count(),
+                'follower_count': Follow.objects.filter(author=user).count(),
+                'following_count': Follow.objects.filter(user=user).count(),
+            })
+            return stats
+
+    def bump(self, user_id, field, delta):
+        """Атомарно сдвигает счетчик, не опуская его ниже нуля."""
+        queryset = self.filter(user_id=user_id)
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        return queryset.update(**{field: F(field) + delta})
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    post_count = models.PositiveIntegerField('Число постов', default=0)
+    follower_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    recommendations_stale = models.BooleanField(
+        'Пересчитать рекомендации', default=True
+    )
+
+    objects = UserStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return str(self.user)
+
+
+class RecommendationQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Рекомендации пользователя по рангу, с авторами."""
+        return self.filter(user=user).select_related('candidate')
+
+
+class Recommendation(models.Model):
+    """Готовая рекомендация "кого почитать", см. posts.recommendations."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Читатель'
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор'
+    )
+    score = models.PositiveIntegerField('Общих подписок', default=0)
+    rank = models.PositiveSmallIntegerField('Место')
+
+    objects = RecommendationQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'candidate'], name='unique_recommendation'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'rank'], name='recommendation_user_rank_idx'
+            ),
+        ]
@@ -0,0 +1,184 @@
+"""Рекомендации "кого почитать" по графу подписок.
+
+Считаются офлайн командой compute_recommendations. Кандидаты для
+пользователя - авторы, на которых подписаны его подписки (друзья
+друзей), вес - число таких подписок; при равенстве выше тот, у кого
+больше подписчиков. Пользователям без подписок и с короткими списками
+добавляются самые популярные авторы с весом 0.
+
+Граф грузится в память одним проходом по Follow: отсортированные
+массивы id авторов (array) на пользователя, подсчет кандидатов - сумма
+строк разреженной матрицы смежности через Counter.update. Результат -
+RECOMMENDATIONS_TOP_K строк на пользователя в Recommendation, страницы
+читают их одним запросом по индексу (user, rank).
+
+Подписка и отписка помечают пользователя в
+UserStats.recommendations_stale, команда с --stale пересчитывает только
+помеченных. Для них грузится не вся таблица Follow, а окрестность в два
+шага: подписки помеченных и подписки их подписок. Подписчики кандидатов
+тогда считаются запросом по Follow, как и при полном пересчете, а
+список популярных авторов берется из UserStats.follower_count.
+"""
+import heapq
+from array import array
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import feed_cache
+from .models import Follow, Recommendation, User, UserStats
+
+RECOMMENDATIONS_TOP_K: int = 10
+RECOMMENDATIONS_SHOWN: int = 5
+BATCH_SIZE: int = 500
+TYPECODE = 'q'
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _add_rows(graph, rows):
+    for user_id, author_id in rows:
+        ids = graph.get(user_id)
+        if ids is None:
+            ids = graph[user_id] = array(TYPECODE)
+        ids.append(author_id)
+
+
+def load_graph(user_ids=None, batch_size=BATCH_SIZE):
+    """user_id -> отсортированный массив id авторов его подписок.
+
+    С user_ids - только их подписки и подписки их подписок: этого
+    достаточно, чтобы посчитать кандидатов для них.
+    """
+    graph = {}
+    rows = Follow.objects.order_by('user_id', 'author_id').values_list(
+        'user_id', 'author_id')
+    if user_ids is None:
+        _add_rows(graph, rows.iterator())
+        return graph
+    wanted, loaded = set(user_ids), set()
+    for _ in range(2):
+        wanted = sorted(wanted - loaded)
+        for batch in _batches(wanted, batch_size):
+            _add_rows(graph, rows.filter(user_id__in=batch))
+        loaded.update(wanted)
+        wanted = {
+            author_id for user_id in wanted
+            for author_id in graph.get(user_id, ())
+        }
+    return graph
+
+
+def follower_counts(graph):
+    counts = Counter()
+    for ids in graph.values():
+        counts.update(ids)
+    return counts
+
+
+def stats_popularity(graph, user_ids, top_k, batch_size=BATCH_SIZE):
+    """Подписчики кандидатов и популярные авторы для графа-окрестности.
+
+    Подписчиков по строкам окрестности не посчитать: для кандидатов они
+    считаются по Follow (индекс по author), так что порядок совпадает с
+    полным пересчетом. Популярных авторов - из UserStats, строки есть
+    у каждого пользователя; их берется столько, чтобы хватило дополнить
+    список любого из user_ids после исключения подписок и кандидатов.
+    """
+    candidates = sorted(set().union(*graph.values()))
+    popularity = Counter()
+    for batch in _batches(candidates, batch_size):
+        popularity.update(dict(
+            Follow.objects.filter(author_id__in=batch).order_by().values(
+                'author_id').annotate(total=Count('pk')).values_list(
+                'author_id', 'total')
+        ))
+    limit = 2 * top_k + 1 + max(
+        (len(graph.get(user_id, ())) for user_id in user_ids), default=0)
+    popular = list(UserStats.objects.filter(
+        follower_count__gt=0
+    ).order_by('-follower_count', 'user_id').values_list(
+        'user_id', flat=True)[:limit])
+    return popularity, popular
+
+
+def recommend(user_id, graph, popularity, popular, top_k):
+    """Пары (автор, вес) лучших кандидатов для пользователя."""
+    following = graph.get(user_id, ())
+    scores = Counter()
+    for author_id in following:
+        scores.update(graph.get(author_id, ()))
+    excluded = set(following)
+    excluded.add(user_id)
+    for author_id in excluded:
+        scores.pop(author_id, None)
+    best = heapq.nlargest(
+        top_k, scores.items(),
+        key=lambda item: (item[1], popularity[item[0]], -item[0]),
+    )
+    if len(best) < top_k:
+        chosen = excluded.union(author_id for author_id, _ in best)
+        for author_id in popular:
+            if author_id not in chosen:
+                best.append((author_id, 0))
+                if len(best) == top_k:
+                    break
+    return best
+
+
+def stale_user_ids():
+    return list(UserStats.objects.filter(
+        recommendations_stale=True
+    ).values_list('user_id', flat=True))
+
+
+def refresh(user_ids=None, top_k=RECOMMENDATIONS_TOP_K,
+            batch_size=BATCH_SIZE):
+    """Пересчитывает рекомендации пользователей (по умолчанию всех).
+
+    Пометки снимаются до загрузки графа: подписка во время пересчета
+    снова пометит пользователя, и следующий запуск его не пропустит.
+    Для заданных user_ids грузится только их окрестность в графе.
+    Возвращает число пользователей и сохраненных строк.
+    """
+    if user_ids is None:
+        UserStats.objects.update(recommendations_stale=False)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        graph = load_graph()
+        popularity = follower_counts(graph)
+        popular = sorted(popularity, key=lambda pk: (-popularity[pk], pk))
+    else:
+        user_ids = list(user_ids)
+        for batch in _batches(user_ids, batch_size):
+            UserStats.objects.filter(user_id__in=batch).update(
+                recommendations_stale=False)
+        graph = load_graph(user_ids, batch_size)
+        popularity, popular = stats_popularity(
+            graph, user_ids, top_k, batch_size)
+    saved = 0
+    for batch in _batches(user_ids, batch_size):
+        rows = [
+            Recommendation(user_id=user_id, candidate_id=author_id,
+                           score=score, rank=rank)
+            for user_id in batch
+            for rank, (author_id, score) in enumerate(
+                recommend(user_id, graph, popularity, popular, top_k), 1)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=batch).delete()
+            Recommendation.objects.bulk_create(rows)
+        feed_cache.bump(
+            *(feed_cache.recommendations_scope(pk) for pk in batch))
+        saved += len(rows)
+    return len(user_ids), saved
+
+
+def for_user(user, limit=RECOMMENDATIONS_SHOWN):
+    """Рекомендации для показа на странице: один запрос по индексу."""
+    if not user.is_authenticated:
+        return []
+    return list(Recommendation.objects.for_user(user)[:limit])
@@ -0,0 +1,112 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite используется FTS5-индекс posts_post_fts (см. миграцию
+0012_post_search_index): выдача ранжируется по bm25 и листается курсором
+по паре (ранг, id). На других СУБД остается медленный поиск через
+icontains, упорядоченный по дате.
+"""
+import base64
+import json
+import re
+
+from django.db import connection
+
+from .models import Post
+from .utils import CursorPage, CursorPaginator
+
+SEARCH_TABLE = 'posts_post_fts'
+MAX_TERMS: int = 10
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берется в кавычки (операторы FTS5 не работают) и ищется
+    как префикс; слова объединяются через AND.
+    """
+    terms = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def encode_cursor(rank, pk):
+    raw = json.dumps([rank, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        rank, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if not isinstance(rank, (int, float)) or not isinstance(pk, int):
+        return None
+    return rank, pk
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset постов только подходящие под запрос.
+
+    Через extra, а не pk__in=RawSQL: Django оборачивает RawSQL во вторые
+    скобки, и SQLite читает IN ((SELECT ...)) как одно скалярное значение.
+    """
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s)'
+        ],
+        params=[build_match(query)],
+    )
+
+
+def ranked_ids(match, limit, after=None):
+    """[(ранг, id)] лучших совпадений после курсора after."""
+    sql = (
+        f'SELECT bm25({SEARCH_TABLE}) AS score, rowid FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    params = [match]
+    if after is not None:
+        sql += (
+            f' AND (bm25({SEARCH_TABLE}) > %s'
+            f' OR (bm25({SEARCH_TABLE}) = %s AND rowid > %s))'
+        )
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY score, rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class SearchPaginator:
+    """Курсорная выдача поиска: только вперед, без COUNT(*)."""
+    is_cursor = True
+
+    def __init__(self, query, per_page):
+        self.query = query
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        match = build_match(self.query)
+        if not match:
+            return CursorPage([], 1, self)
+        if not fts_available():
+            return CursorPaginator(
+                Post.objects.for_feed().filter(text__icontains=self.query),
+                self.per_page,
+            ).get_page(cursor)
+        after = decode_cursor(cursor) if cursor else None
+        rows = ranked_ids(match, self.per_page + 1, after)
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        posts = Post.objects.for_feed().in_bulk([pk for _, pk in rows])
+        items = [posts[pk] for _, pk in rows if pk in posts]
+        return CursorPage(
+            items, 1 if after is None else None, self,
+            next_cursor=encode_cursor(*rows[-1]) if has_next else None,
+        )
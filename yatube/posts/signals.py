@@ -0,0 +1,153 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import feed_cache, timeline, trending
+from .models import (
+    Comment, Follow, Group, Post, Recommendation, User, UserStats,
+)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Группа при загрузке нужна, чтобы сбросить кэш старой группы
+    # при переносе поста. Через __dict__, чтобы не грузить отложенное поле.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_init, sender=User)
+def remember_name(sender, instance, **kwargs):
+    # Имя автора показывается в карточках постов внутри кэшированных лент.
+    instance._loaded_name = _shown_name(instance)
+
+
+def _shown_name(user):
+    fields = user.__dict__
+    return (fields.get('username'), fields.get('first_name'),
+            fields.get('last_name'))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # Строка счетчиков есть у каждого пользователя: bump() и пометка
+        # recommendations_stale обновляют только существующие строки.
+        UserStats.objects.get_or_create(user=instance)
+        return
+    name = _shown_name(instance)
+    if name == instance._loaded_name:
+        return
+    instance._loaded_name = name
+    # Карточки сменят ключ сами (feed_cache.card_key), а ленты, в которые
+    # они вложены, нужно сбросить.
+    group_ids = instance.posts.exclude(group=None).order_by().values_list(
+        'group_id', flat=True).distinct()
+    # Имя комментатора видно на страницах чужих постов.
+    commented = Comment.objects.filter(author=instance).order_by(
+        'post_id').values_list('post_id', flat=True).distinct()
+    feed_cache.bump(
+        feed_cache.INDEX_SCOPE,
+        feed_cache.profile_scope(instance.pk),
+        *(feed_cache.group_scope(group_id) for group_id in group_ids),
+        *(feed_cache.post_scope(post_id) for post_id in commented),
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    # Название и описание видны на странице группы, а slug - в ссылках
+    # карточек, поэтому сбрасываются и все ленты с постами группы.
+    scopes = {feed_cache.group_scope(instance.pk)}
+    posts = Post.objects.filter(group=instance).only('author_id', 'group_id')
+    for post in posts.order_by().iterator():
+        scopes |= feed_cache.post_scopes(post)
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        timeline.fan_out(instance)
+        trending.record(instance, trending.POST_WEIGHT)
+        UserStats.objects.bump(instance.author_id, 'post_count', 1)
+    feed_cache.bump(
+        *feed_cache.post_scopes(instance, instance._loaded_group_id)
+    )
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    UserStats.objects.bump(instance.author_id, 'post_count', -1)
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+
+
+def comment_changed(comment):
+    post = Post.objects.filter(pk=comment.post_id).only(
+        'author_id', 'group_id').first()
+    if post is not None:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+    return post
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+        post = comment_changed(instance)
+        if post is not None:
+            trending.record(post, trending.COMMENT_WEIGHT)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if getattr(instance, 'deleted_with_post', False):
+        # Пост удаляется целиком: его кэш сбросит post_deleted.
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+    comment_changed(instance)
+
+
+def follow_changed(follow):
+    UserStats.objects.filter(user_id=follow.user_id).update(
+        recommendations_stale=True)
+    scopes = (feed_cache.follow_scope(follow.user_id),
+              feed_cache.follow_scope(follow.author_id),
+              feed_cache.recommendations_scope(follow.user_id))
+    feed_cache.bump(*scopes)
+    # Повторно после коммита: другой процесс мог между сбросом и коммитом
+    # загрузить граф подписок без этой строки и сохранить под новым токеном.
+    transaction.on_commit(lambda: feed_cache.bump(*scopes))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+        UserStats.objects.bump(instance.user_id, 'following_count', 1)
+        UserStats.objects.bump(instance.author_id, 'follower_count', 1)
+        # Автор больше не кандидат, остальное пересчитает
+        # compute_recommendations --stale.
+        Recommendation.objects.filter(
+            user_id=instance.user_id, candidate_id=instance.author_id
+        ).delete()
+        follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+    UserStats.objects.bump(instance.user_id, 'following_count', -1)
+    UserStats.objects.bump(instance.author_id, 'follower_count', -1)
+    follow_changed(instance)
@@ -0,0 +1,69 @@
+from django import template
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import feed_cache
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, scope):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.scope = scope
+
+    def render(self, context):
+        request = context.get('request')
+        params = request.GET if request is not None else {}
+        return feed_cache.fragment(
+            self.fragment_name.resolve(context),
+            str(self.scope.resolve(context)),
+            [params.get('page'), params.get('cursor')],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag('feedcache')
+def do_feedcache(parser, token):
+    """Кэширует ленту до изменения постов в ее области.
+
+    Использование::
+
+        {% feedcache 'index_page' feed_scope %} ... {% endfeedcache %}
+
+    Ключ учитывает версию области и параметры page/cursor запроса.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает имя фрагмента и область ленты."
+        )
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    return FeedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+    )
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек постов страницы через кэш карточек.
+
+    Использование::
+
+        {% post_cards page_obj as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+
+    Промахи рендерятся скомпилированным post_card.html без контекстных
+    процессоров: карточка не зависит от запроса и пользователя.
+    """
+    card = get_template(CARD_TEMPLATE)
+    return [
+        mark_safe(html) for html in feed_cache.cards(
+            posts, lambda post: card.render({'post': post}))
+    ]
@@ -0,0 +1,58 @@
+from django import template
+from django.utils.encoding import smart_str
+from sorl.thumbnail.templatetags.thumbnail import ThumbnailNode, kw_pat
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+class PostThumbnailNode(ThumbnailNode):
+    """{% thumbnail %} из sorl, который не создает миниатюру при рендере.
+
+    Готовая миниатюра берется из key-value хранилища sorl, а пока ее нет,
+    рендерится блок {% empty %} с заглушкой.
+    """
+    error_msg = ('Синтаксис: ``post_thumbnail source geometry '
+                 '[key1=val1 key2=val2...] as var``')
+
+    def __init__(self, parser, token):
+        bits = token.split_contents()
+        if len(bits) < 5 or bits[-2] != 'as':
+            raise template.TemplateSyntaxError(self.error_msg)
+        self.file_ = parser.compile_filter(bits[1])
+        self.geometry = parser.compile_filter(bits[2])
+        self.as_var = bits[-1]
+        self.options = []
+        for bit in bits[3:-2]:
+            match = kw_pat.match(bit)
+            if not match:
+                raise template.TemplateSyntaxError(self.error_msg)
+            self.options.append((
+                smart_str(match.group('key')),
+                parser.compile_filter(match.group('value')),
+            ))
+        self.nodelist_file = parser.parse(('empty', 'endpost_thumbnail'))
+        if parser.next_token().contents == 'empty':
+            self.nodelist_empty = parser.parse(('endpost_thumbnail',))
+            parser.delete_first_token()
+
+    def _render(self, context):
+        options = {}
+        for key, expr in self.options:
+            noresolve = {'True': True, 'False': False, 'None': None}
+            options[key] = noresolve.get(str(expr), expr.resolve(context))
+        thumbnail = thumbnails.lookup(
+            self.file_.resolve(context),
+            self.geometry.resolve(context),
+            **options
+        )
+        if thumbnail is None:
+            return self.nodelist_empty.render(context)
+        with context.push(**{self.as_var: thumbnail}):
+            return self.nodelist_file.render(context)
+
+
+@register.tag
+def post_thumbnail(parser, token):
+    return PostThumbnailNode(parser, token)
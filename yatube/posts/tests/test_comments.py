@@ -0,0 +1,54 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..utils import COMMENTS_PER_PAGE
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.post = Post.objects.create(author=cls.user, text='text')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'comment {number}')
+            for number in range(COMMENTS_PER_PAGE + 5)
+        )
+        Post.objects.filter(pk=cls.post.pk).update(
+            comment_count=COMMENTS_PER_PAGE + 5)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_detail_shows_first_page(self):
+        """На странице поста только самые новые комментарии и счетчик."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+        self.assertContains(
+            response, f'Комментарии: {COMMENTS_PER_PAGE + 5}')
+        self.assertContains(response, reverse(
+            'posts:post_comments', args=(self.post.pk,)))
+
+    def test_fragment_returns_next_batch(self):
+        first = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        ).context['comments']
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:post_comments', args=(self.post.pk,)),
+                {'cursor': first.next_cursor},
+            )
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(rest.has_next())
+        self.assertFalse({c.pk for c in first} & {c.pk for c in rest})
+
+    def test_fragment_for_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk + 1,)))
+        self.assertEqual(response.status_code, 404)
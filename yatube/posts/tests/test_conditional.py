@@ -0,0 +1,113 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test-text', slug='test-slug', description='description')
+        cls.post = Post.objects.create(
+            author=cls.user, text='text', group=cls.group)
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=('test-slug',)),
+            'profile': reverse('posts:profile', args=('NoName',)),
+            'post_detail': reverse(
+                'posts:post_detail', args=(cls.post.pk,)),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def revalidate(self, url, client=None):
+        """Статус повторного запроса с ETag первого ответа."""
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def assertChangesEtag(self, url, change):
+        etag = self.client.get(url)['ETag']
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_pages_not_modified(self):
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                self.assertEqual(self.revalidate(url), 304)
+
+    def test_not_modified_skips_rendering(self):
+        url = self.urls['index']
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+        self.assertIsNone(response.context)
+
+    def test_etag_differs_per_user_and_page(self):
+        url = self.urls['post_detail']
+        etag = self.client.get(url)['ETag']
+        for client in (Client(), self.author_client()):
+            with self.subTest(client=client):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            url, {'cursor': 'x'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def author_client(self):
+        client = Client()
+        client.force_login(self.user)
+        return client
+
+    def test_new_post_changes_feeds(self):
+        for name in ('index', 'group_list', 'profile', 'post_detail'):
+            with self.subTest(view=name):
+                self.assertChangesEtag(
+                    self.urls[name],
+                    lambda: Post.objects.create(
+                        author=self.user, text='new', group=self.group),
+                )
+
+    def test_comment_changes_post_detail(self):
+        self.assertChangesEtag(
+            self.urls['post_detail'],
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='comment'),
+        )
+
+    def test_follow_changes_profile(self):
+        self.assertChangesEtag(
+            self.urls['profile'],
+            lambda: Follow.objects.create(user=self.reader, author=self.user),
+        )
+
+    def test_group_edit_changes_group_pages(self):
+        def edit():
+            self.group.title = 'new title'
+            self.group.save()
+
+        for name in ('group_list', 'post_detail'):
+            with self.subTest(view=name):
+                self.assertChangesEtag(self.urls[name], edit)
+        response = self.client.get(self.urls['group_list'])
+        self.assertContains(response, 'new title')
+
+    def test_commenter_rename_changes_post_detail(self):
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='comment')
+
+        def rename():
+            self.reader.first_name = 'Renamed'
+            self.reader.save()
+
+        self.assertChangesEtag(self.urls['post_detail'], rename)
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='text')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.for_user(user)
+
+    def test_new_user_gets_stats_row(self):
+        """Строка счетчиков создается при регистрации, а не при чтении."""
+        user = User.objects.create_user(username='new')
+        Follow.objects.create(user=user, author=self.author)
+        row = UserStats.objects.get(user=user)
+        self.assertEqual(row.following_count, 1)
+        self.assertTrue(row.recommendations_stale)
+
+    def test_stats_seeded_from_real_counts(self):
+        """Без строки (bulk_create) чтение считает счетчики по базе."""
+        UserStats.objects.filter(user=self.author).delete()
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'bulk {i}') for i in range(3))
+        self.assertEqual(self.stats(self.author).post_count, 4)
+
+    def test_reconcile_creates_missing_rows(self):
+        UserStats.objects.filter(user=self.author).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).post_count, 1)
+
+    def test_post_delete_skips_per_comment_updates(self):
+        """Удаление поста не пересчитывает его по каждому комментарию."""
+        queries = []
+        for comments in (1, 5):
+            post = Post.objects.create(author=self.author, text='post')
+            for _ in range(comments):
+                Comment.objects.create(
+                    post=post, author=self.reader, text='comment')
+            with CaptureQueriesContext(connection) as context:
+                post.delete()
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+        self.assertEqual(self.stats(self.author).post_count, 1)
+
+    def test_signals_keep_counters_current(self):
+        """Сигналы обновляют счетчики постов, подписок и комментариев."""
+        self.stats(self.author)
+        self.stats(self.reader)
+        post = Post.objects.create(author=self.author, text='new')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='comment')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).post_count, 2)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_post_edit_keeps_comment_count(self):
+        """Редактирование поста не затирает счетчик комментариев."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        stale.text = 'edited'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile_counters исправляет расхождения."""
+        self.stats(self.author)
+        UserStats.objects.filter(user=self.author).update(post_count=42)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.stats(self.author).post_count, 1)
+
+    def test_profile_reads_counters(self):
+        """Профиль показывает счетчики без агрегатов."""
+        self.stats(self.author)
+        UserStats.objects.filter(user=self.author).update(
+            post_count=5, follower_count=3)
+        response = self.reader_client.get(
+            reverse('posts:profile', args=(self.author.username,)))
+        self.assertEqual(response.context['post_count'], 5)
+        self.assertEqual(response.context['follower_count'], 3)
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import feed_cache
+from ..models import Group, Post, User
+from ..utils import LAST_10_POSTS
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='test-text', slug='test-slug', description='description')
+        cls.other_group = Group.objects.create(
+            title='other', slug='other-slug', description='description')
+        for i in range(LAST_10_POSTS + 1):
+            Post.objects.create(
+                author=cls.user, text=f'post number {i}', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        # Счетчики попаданий - в метриках процесса, у теста свой каталог.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = self.settings(METRICS_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_pages_are_cached_separately(self):
+        """Каждая страница ленты кэшируется под своим ключом."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).content.decode()
+        second = self.guest_client.get(url, {'page': 2}).content.decode()
+        self.assertIn('post number 10', first)
+        self.assertNotIn('post number 10', second)
+        self.assertIn('post number 0', second)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сразу виден на главной, в группе и в профиле."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(author=self.user, text='fresh', group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn('fresh', self.guest_client.get(url)
+                              .content.decode())
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает кэш старой группы."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertIn('post number 10',
+                      self.guest_client.get(url).content.decode())
+        post = Post.objects.get(text='post number 10')
+        post.group = self.other_group
+        post.save()
+        self.assertNotIn('post number 10',
+                         self.guest_client.get(url).content.decode())
+
+    def test_hit_and_miss_counters(self):
+        """Попадания и промахи фрагмента считаются."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+        stats = feed_cache.stats()['index_page']
+        self.assertEqual(stats, {'hits': 1, 'misses': 1})
+
+    def test_post_cards_survive_feed_reset(self):
+        """Карточки берутся из кэша, пока не изменился сам пост."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        post = Post.objects.get(text='post number 10')
+        feed_cache.bump(feed_cache.INDEX_SCOPE)
+        self.guest_client.get(url)
+        self.assertEqual(feed_cache.stats()['post_card'],
+                         {'hits': LAST_10_POSTS, 'misses': LAST_10_POSTS})
+        post.text = 'edited'
+        post.save()
+        self.assertIn('edited', self.guest_client.get(url).content.decode())
+        self.assertEqual(feed_cache.stats()['post_card'],
+                         {'hits': 2 * LAST_10_POSTS - 1,
+                          'misses': LAST_10_POSTS + 1})
+
+    def test_author_rename_refreshes_cards_and_feeds(self):
+        """Новое имя автора видно в лентах и в карточках из кэша."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:search'),
+        )
+        for url in urls:
+            self.guest_client.get(url, {'q': 'post'})
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url, {'q': 'post'}), 'Новое Имя')
@@ -0,0 +1,78 @@
+from array import array
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author-{i}')
+            for i in range(3)
+        ]
+        for author in cls.authors[1:]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        follow_graph.local.clear()
+
+    def test_answers_match_database(self):
+        first, second, third = (author.pk for author in self.authors)
+        self.assertEqual(list(follow_graph.following(self.reader.pk)),
+                         sorted([second, third]))
+        self.assertTrue(follow_graph.follows(self.reader.pk, second))
+        self.assertFalse(follow_graph.follows(self.reader.pk, first))
+        self.assertFalse(follow_graph.follows(second, self.reader.pk))
+        self.assertEqual(follow_graph.follower_count(third), 1)
+        self.assertEqual(follow_graph.follower_count(first), 0)
+        self.assertEqual(follow_graph.following_count(self.reader.pk), 2)
+
+    def test_warm_lookups_skip_database(self):
+        follow_graph.follows(self.reader.pk, self.authors[0].pk)
+        with self.assertNumQueries(0):
+            follow_graph.follows(self.reader.pk, self.authors[1].pk)
+        # Другой процесс берет массив из общего кэша.
+        follow_graph.local.clear()
+        with self.assertNumQueries(0):
+            follow_graph.following(self.reader.pk)
+
+    def test_follow_and_unfollow_invalidate_graph(self):
+        client = Client()
+        client.force_login(self.reader)
+        author = self.authors[0]
+        self.assertFalse(follow_graph.follows(self.reader.pk, author.pk))
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+        client.get(reverse('posts:profile_follow', args=[author.username]))
+        self.assertTrue(follow_graph.follows(self.reader.pk, author.pk))
+        self.assertEqual(follow_graph.follower_count(author.pk), 1)
+        client.get(reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertFalse(follow_graph.follows(self.reader.pk, author.pk))
+        self.assertEqual(follow_graph.follower_count(author.pk), 0)
+
+    def test_profile_shows_following_from_graph(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=[self.authors[1].username])
+        client.get(url)
+        with self.assertNumQueries(0):
+            follow_graph.follows(self.reader.pk, self.authors[1].pk)
+        self.assertTrue(client.get(url).context['following'])
+
+    def test_local_cache_is_bounded_by_ids(self):
+        graph = follow_graph.LocalGraph(max_ids=5)
+        graph.put(('following', 1), 'a', array('q', [1, 2, 3]))
+        graph.put(('following', 2), 'a', array('q', [4, 5]))
+        self.assertIsNotNone(graph.get(('following', 1), 'a'))
+        graph.put(('following', 3), 'a', array('q', [6]))
+        self.assertIsNone(graph.get(('following', 2), 'a'))
+        self.assertIsNotNone(graph.get(('following', 1), 'a'))
+        self.assertIsNone(graph.get(('following', 1), 'b'))
+        self.assertEqual(graph.size, 4)
@@ -0,0 +1,137 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Ориентация 6: камера повернута, картинку нужно повернуть на 90°.
+EXIF_ORIENTATION: int = 0x0112
+# Замер пика памяти в отдельном процессе: ru_maxrss монотонен.
+PEAK_MEMORY_SCRIPT = '''
+import resource, sys
+from django.core.files import File
+from posts.images import normalize
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(sys.argv[1], 'rb') as file:
+    normalize(File(file, name='big.jpg'))
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print((after - before) * 1024)
+'''
+
+
+def image_upload(name, size, image_format='JPEG', mode='RGB', **options):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def exif_with_orientation(orientation):
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    return exif.tobytes()
+
+
+class NormalizeTests(TestCase):
+    def test_large_jpeg_is_downscaled(self):
+        upload = image_upload('photo.jpg', (4000, 3000))
+        result = images.normalize(upload)
+        image = Image.open(result)
+        self.assertEqual(result.name, 'photo.jpg')
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (images.MAX_IMAGE_SIDE, 1440))
+
+    def test_exif_is_applied_and_stripped(self):
+        upload = image_upload('photo.jpg', (300, 200),
+                              exif=exif_with_orientation(6))
+        image = Image.open(images.normalize(upload))
+        self.assertEqual(image.size, (200, 300))
+        self.assertNotIn('exif', image.info)
+
+    def test_png_keeps_format_and_alpha(self):
+        upload = image_upload('logo.png', (2500, 100), 'PNG', 'RGBA')
+        image = Image.open(images.normalize(upload))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+        self.assertEqual(image.size, (images.MAX_IMAGE_SIDE, 77))
+
+    def test_other_formats_are_untouched(self):
+        for upload in (image_upload('anim.gif', (10, 10), 'GIF'),
+                       SimpleUploadedFile('broken.jpg', b'not an image')):
+            with self.subTest(name=upload.name):
+                self.assertIs(images.normalize(upload), upload)
+
+    def test_jpeg_is_not_decoded_at_full_size(self):
+        """Пик памяти меньше четверти полного кадра 8000x6000.
+
+        Pillow хранит RGB по 4 байта на пиксель.
+        """
+        full_frame = 8000 * 6000 * 4
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as file:
+            Image.new('RGB', (8000, 6000), 'red').save(file, 'JPEG')
+            file.flush()
+            output = subprocess.run(
+                [sys.executable, '-c', PEAK_MEMORY_SCRIPT, file.name],
+                cwd=settings.BASE_DIR, check=True, capture_output=True,
+                text=True,
+            ).stdout
+        self.assertLess(int(output), full_frame / 4)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   THUMBNAIL_PIPELINE_ASYNC=False)
+class PostImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_image_is_normalized_on_save(self):
+        post = Post.objects.create(
+            author=self.user, text='text',
+            image=image_upload('photo.jpg', (3000, 1000),
+                               exif=exif_with_orientation(1)))
+        self.assertRegex(post.image.name, r'^posts/photo\w*\.jpg$')
+        with Image.open(os.path.join(TEMP_MEDIA_ROOT, post.image.name)) as im:
+            self.assertEqual(im.size, (images.MAX_IMAGE_SIDE, 640))
+            self.assertNotIn('exif', im.info)
+
+    def test_saved_image_is_not_normalized_again(self):
+        post = Post.objects.create(
+            author=self.user, text='text',
+            image=image_upload('photo.jpg', (100, 100)))
+        name = post.image.name
+        post.text = 'edited'
+        with mock.patch.object(images, 'normalize') as normalize:
+            post.save()
+        normalize.assert_not_called()
+        self.assertEqual(post.image.name, name)
+
+    @skipUnless(thumbnails.WEBP_SUPPORTED, 'Pillow собран без WebP')
+    def test_webp_variant_is_generated(self):
+        post = Post.objects.create(
+            author=self.user, text='text',
+            image=image_upload('photo.jpg', (100, 100)))
+        thumbnails.generate(post.image.name)
+        geometry, options = thumbnails.POST_CARD_WEBP
+        thumbnail = thumbnails.lookup(post.image, geometry, **options)
+        self.assertTrue(thumbnail.name.endswith('.webp'))
@@ -0,0 +1,71 @@
+import re
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..utils import LAST_10_POSTS, CursorPaginator
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы лент читают индекс и не сортируют во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='test-text', slug='test-slug', description='description')
+        cls.post = Post.objects.create(
+            author=cls.user, text='text', group=cls.group)
+
+    def assertUsesIndex(self, queryset, table, index):
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertRegex(
+            plan,
+            rf'(SEARCH|SCAN)( TABLE)? {table} USING (COVERING )?'
+            rf'INDEX {re.escape(index)}'
+        )
+
+    def cursor_page(self, queryset):
+        return CursorPaginator(queryset, LAST_10_POSTS)._after(
+            self.post.pub_date, self.post.pk)[:LAST_10_POSTS + 1]
+
+    def test_feed_queries_use_indexes(self):
+        feeds = {
+            'index': (Post.objects.for_feed(), 'posts_post',
+                      'post_pub_date_id_idx'),
+            'group_list': (self.group.posts.for_feed(), 'posts_post',
+                           'post_group_pub_date_idx'),
+            'profile': (self.user.posts.for_feed(), 'posts_post',
+                        'post_author_pub_date_idx'),
+            'follow_index': (TimelineEntry.objects.for_feed(self.user),
+                             'posts_timelineentry',
+                             'timeline_user_pub_date_idx'),
+            'post_detail': (Comment.objects.for_post(self.post),
+                            'posts_comment', 'comment_post_pub_date_idx'),
+        }
+        for view, (queryset, table, index) in feeds.items():
+            with self.subTest(view=view):
+                self.assertUsesIndex(
+                    queryset[:LAST_10_POSTS], table, index)
+            with self.subTest(view=view, cursor=True):
+                self.assertUsesIndex(
+                    self.cursor_page(queryset), table, index)
+
+    def test_follow_check_uses_unique_index(self):
+        plan = Follow.objects.filter(
+            user=self.user, author=self.user).explain()
+        self.assertRegex(plan, r'SEARCH( TABLE)? posts_follow USING')
+
+
+class FollowUniqueTests(TestCase):
+    def test_duplicate_follow_rejected(self):
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=user, author=author)
@@ -0,0 +1,79 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..management.commands.load_test import (REQUEST_MIX, Command,
+                                             percentile)
+from ..models import Comment, Follow, Post, TimelineEntry, UserStats
+
+
+class LoadReportTests(SimpleTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, share) for share in
+                          (1, 50, 95, 99, 100)], [1, 50, 95, 99, 100])
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_unsent_requests_are_errors_without_latency(self):
+        summary = Command().summarize([
+            ('index', None, None, None),
+            ('index', 0.01, 3, 200),
+        ])
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['p50_ms'], 10.0)
+        self.assertEqual(Command().summarize([]),
+                         {'requests': 0, 'errors': 0, 'rate_limited': 0})
+
+
+class LoadCommandsTests(TransactionTestCase):
+    """Потоки load_test ходят в базу своими соединениями, поэтому данные
+    должны быть закоммичены: используется TransactionTestCase."""
+
+    def seed(self):
+        call_command('seed_data', users=12, groups=2, posts=60,
+                     comments=80, follows=3, seed=1, stdout=StringIO())
+
+    def test_seed_data(self):
+        self.seed()
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertGreater(Follow.objects.count(), 0)
+        self.assertGreater(TimelineEntry.objects.count(), 0)
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1)
+        busiest = Post.objects.order_by('-comment_count').first()
+        self.assertEqual(busiest.comment_count, busiest.comments.count())
+        stats = UserStats.objects.get(user=busiest.author)
+        self.assertEqual(stats.post_count, busiest.author.posts.count())
+
+    def test_load_test_report(self):
+        self.seed()
+        out = StringIO()
+        call_command('load_test', requests=40, threads=2, warmup=0,
+                     seed=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['total']['requests'], 40)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertLessEqual(set(report['views']), set(REQUEST_MIX))
+        for view in report['views'].values():
+            self.assertLessEqual(view['p50_ms'], view['p99_ms'])
+            self.assertIn('queries_mean', view)
+
+    def test_load_test_disables_rate_limits(self):
+        self.seed()
+        # По 15 публикаций на поток - больше пачки лимита post_create.
+        options = dict(requests=30, threads=2, warmup=0, seed=1,
+                       mix={'post_create': 1})
+        out = StringIO()
+        call_command('load_test', stdout=out, **options)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(report['total']['rate_limited'], 0)
+        # С --rate-limits те же публикации упираются в лимит.
+        out = StringIO()
+        call_command('load_test', '--rate-limits', stdout=out, **options)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['total']['rate_limited'], 0)
@@ -1,6 +1,6 @@
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -48,3 +48,35 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class QuerySetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+        for i in range(5):
+            Post.objects.create(author=cls.user, text=f'пост {i}',
+                                group=cls.group)
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'комментарий {i}')
+
+    def test_for_feed_loads_author_and_group_in_one_query(self):
+        """for_feed не делает запросов на автора и группу каждого поста."""
+        with self.assertNumQueries(1):
+            for post in Post.objects.for_feed():
+                post.author.username
+                post.group.slug
+
+    def test_for_post_loads_comment_authors_in_one_query(self):
+        """for_post не делает запросов на автора каждого комментария."""
+        with self.assertNumQueries(1):
+            for comment in Comment.objects.for_post(self.post):
+                comment.author.username
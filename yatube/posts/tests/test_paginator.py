@@ -0,0 +1,82 @@
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+from ..utils import (LAST_10_POSTS, SHALLOW_PAGES, CursorPage,
+                     paginator_create)
+
+TOTAL_POSTS: int = 25
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'post-{i}')
+            for i in range(TOTAL_POSTS)
+        )
+        cls.ordered = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def ids(self, response):
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_cursor_walks_feed_without_gaps(self):
+        """Курсоры next/prev проходят ленту без пропусков и повторов."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj, CursorPage)
+        self.assertFalse(page_obj.has_previous())
+        seen = self.ids(response)
+        pages = [seen]
+        while page_obj.has_next():
+            response = self.guest_client.get(
+                url, {'cursor': page_obj.next_cursor})
+            page_obj = response.context['page_obj']
+            pages.append(self.ids(response))
+            seen += pages[-1]
+        self.assertEqual(seen, self.ordered)
+        response = self.guest_client.get(
+            url, {'cursor': page_obj.previous_cursor})
+        self.assertEqual(self.ids(response), pages[-2])
+
+    def test_cursor_mode_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        request = RequestFactory().get(reverse('posts:index'))
+        with self.assertNumQueries(1):
+            page_obj = paginator_create(request, Post.objects.all())
+        self.assertEqual(len(page_obj), LAST_10_POSTS)
+
+    def test_shallow_page_numbers_still_work(self):
+        """Старые ссылки ?page=N работают для первых страниц."""
+        response = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(
+            self.ids(response),
+            self.ordered[LAST_10_POSTS:2 * LAST_10_POSTS]
+        )
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': SHALLOW_PAGES})
+        self.assertEqual(response.context['page_obj'].number, SHALLOW_PAGES)
+
+    def test_deep_page_numbers_return_404(self):
+        """Номер страницы дальше SHALLOW_PAGES не подменяется другой."""
+        for page in (SHALLOW_PAGES + 1, SHALLOW_PAGES + 100):
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'page': page})
+                self.assertEqual(response.status_code, 404)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'garbage'})
+        self.assertEqual(self.ids(response), self.ordered[:LAST_10_POSTS])
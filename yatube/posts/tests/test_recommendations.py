@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, Recommendation, User, UserStats
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.other, cls.star, cls.new = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'other', 'star', 'new')
+        )
+        for user, author in ((cls.reader, cls.friend),
+                             (cls.reader, cls.other),
+                             (cls.friend, cls.star),
+                             (cls.other, cls.star),
+                             (cls.friend, cls.new)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def candidates(self, user):
+        return list(Recommendation.objects.for_user(user).values_list(
+            'candidate__username', 'score'))
+
+    def test_friends_of_friends_are_ranked_by_mutual_follows(self):
+        recommendations.refresh()
+        self.assertEqual(self.candidates(self.reader),
+                         [('star', 2), ('new', 1)])
+        # Без подписок - популярные авторы, кроме себя.
+        self.assertEqual(self.candidates(self.star),
+                         [('friend', 0), ('other', 0), ('new', 0)])
+
+    def test_top_k_limits_rows(self):
+        recommendations.refresh(top_k=1)
+        self.assertEqual(self.candidates(self.reader), [('star', 2)])
+
+    def test_follow_marks_user_stale_and_drops_candidate(self):
+        recommendations.refresh()
+        self.assertEqual(recommendations.stale_user_ids(), [])
+        self.client.get(reverse('posts:profile_follow', args=['star']))
+        self.assertEqual(recommendations.stale_user_ids(), [self.reader.pk])
+        self.assertEqual(self.candidates(self.reader), [('new', 1)])
+
+    def test_stale_refresh_recomputes_only_marked_users(self):
+        recommendations.refresh()
+        Recommendation.objects.filter(user=self.friend).delete()
+        self.client.get(reverse('posts:profile_follow', args=['new']))
+        out = StringIO()
+        call_command('compute_recommendations', '--stale', stdout=out)
+        self.assertIn('Пересчитано пользователей: 1', out.getvalue())
+        self.assertEqual(self.candidates(self.reader), [('star', 2)])
+        self.assertEqual(self.candidates(self.friend), [])
+        self.assertEqual(recommendations.stale_user_ids(), [])
+
+    def test_stale_refresh_loads_neighbourhood_only(self):
+        """Для части пользователей граф - окрестность, результат тот же."""
+        graph = recommendations.load_graph([self.reader.pk])
+        self.assertEqual(set(graph),
+                         {self.reader.pk, self.friend.pk, self.other.pk})
+        recommendations.refresh()
+        users = (self.reader, self.star)
+        full = [self.candidates(user) for user in users]
+        Recommendation.objects.all().delete()
+        recommendations.refresh([user.pk for user in users])
+        self.assertEqual([self.candidates(user) for user in users], full)
+
+    def test_stale_refresh_breaks_ties_by_real_followers(self):
+        """Равные кандидаты - по подписчикам из Follow, а не из UserStats."""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.other, author=self.new)
+        Follow.objects.create(user=fan, author=self.new)
+        UserStats.objects.filter(user=self.new).delete()
+        recommendations.refresh([self.reader.pk])
+        self.assertEqual(self.candidates(self.reader),
+                         [('new', 2), ('star', 2)])
+
+    def test_pages_show_recommendations_with_one_query(self):
+        recommendations.refresh()
+        with self.assertNumQueries(1):
+            shown = recommendations.for_user(self.reader)
+        self.assertEqual([item.candidate.username for item in shown],
+                         ['star', 'new'])
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=['friend'])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['recommendations'], shown)
+                self.assertContains(response, 'Кого почитать')
+
+    def test_profile_etag_changes_after_refresh(self):
+        url = reverse('posts:profile', args=['friend'])
+        etag = self.client.get(url)['ETag']
+        recommendations.refresh()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Кого почитать')
@@ -0,0 +1,72 @@
+from unittest import skipUnless
+
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import SearchPaginator, build_match
+
+
+class BuildMatchTests(TestCase):
+    def test_operators_are_quoted(self):
+        """Операторы FTS5 из ввода не попадают в запрос."""
+        self.assertEqual(build_match('кот* OR "пес"'),
+                         '"кот"* "OR"* "пес"*')
+        self.assertEqual(build_match(' -*" '), '')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='NoName')
+        self.best = Post.objects.create(
+            author=self.user, text='Котики котики котики')
+        self.other = Post.objects.create(
+            author=self.user, text='Про котиков и немного про собак')
+        Post.objects.create(author=self.user, text='Только собаки')
+
+    def search(self, query, per_page=10, cursor=None):
+        return SearchPaginator(query, per_page).get_page(cursor)
+
+    def test_results_are_ranked(self):
+        page = self.search('котик')
+        self.assertEqual(list(page), [self.best, self.other])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.text = 'Теперь только про птиц'
+        self.other.save()
+        self.assertEqual(list(self.search('котик')), [self.best])
+        self.assertEqual(list(self.search('птиц')), [self.other])
+        self.best.delete()
+        self.assertEqual(list(self.search('котик')), [])
+
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'котик номер {number}')
+            for number in range(5)
+        )
+        seen, cursor = [], None
+        while True:
+            page = self.search('котик', per_page=3, cursor=cursor)
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_search_view(self):
+        response = Client().get(reverse('posts:search'), {'q': 'собак'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_admin_search_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), 'собак')
+        self.assertIn('posts_post_fts', str(queryset.query))
+        self.assertEqual(queryset.count(), 2)
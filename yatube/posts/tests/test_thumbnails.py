@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import feed_cache, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg_upload(name='photo.jpg', size=(120, 60)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   THUMBNAIL_PIPELINE_ASYNC=False)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_render_shows_placeholder_without_generating(self):
+        """Без готовой миниатюры шаблон не декодирует картинку."""
+        post = Post.objects.create(
+            author=self.user, text='text', image=jpeg_upload())
+        with mock.patch('sorl.thumbnail.default.backend.get_thumbnail') as gen:
+            response = self.authorized_client.get(
+                reverse('posts:post_detail', args=(post.pk,)))
+            self.authorized_client.get(reverse('posts:index'))
+        gen.assert_not_called()
+        self.assertContains(response, 'img/placeholder.svg')
+
+    def test_generated_thumbnail_is_rendered(self):
+        """После генерации шаблоны отдают готовую миниатюру."""
+        post = Post.objects.create(
+            author=self.user, text='text', image=jpeg_upload())
+        scope = feed_cache.post_scope(post.pk)
+        placeholder_version = feed_cache.version(scope)
+        thumbnails.generate(post.image.name)
+        self.assertNotEqual(feed_cache.version(scope), placeholder_version)
+        for geometry, options in thumbnails.THUMBNAIL_SIZES:
+            with self.subTest(options=options):
+                self.assertIsNotNone(
+                    thumbnails.lookup(post.image, geometry, **options))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertNotContains(response, 'img/placeholder.svg')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_form_schedules_generation(self):
+        """Сохранение картинки через форму ставит генерацию в очередь."""
+        with mock.patch('posts.forms.transaction.on_commit',
+                        side_effect=lambda callback: callback()), \
+                mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'with image', 'image': jpeg_upload()},
+            )
+        post = Post.objects.get(text='with image')
+        schedule.assert_called_once_with(post.image.name)
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        for i in range(3):
+            Post.objects.create(author=cls.author, text=f'old-{i}')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def timeline_ids(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user).values_list(
+                'post_id', flat=True)
+        )
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        """Подписка догружает посты автора, отписка их убирает."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(
+            self.timeline_ids(self.reader),
+            list(self.author.posts.values_list('pk', flat=True))
+        )
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertEqual(self.timeline_ids(self.reader), [])
+
+    def test_new_post_fans_out_to_followers_only(self):
+        """Новый пост попадает только в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='fresh')
+        self.assertEqual(self.timeline_ids(self.reader)[0], post.pk)
+        self.assertEqual(self.timeline_ids(self.stranger), [])
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_trim_keeps_newest_entries(self):
+        """Лента обрезается до заданного числа новейших записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        newest = self.timeline_ids(self.reader)[:2]
+        timeline.trim(self.reader.pk, length=2)
+        self.assertEqual(self.timeline_ids(self.reader), newest)
+
+    def test_fan_out_leaves_trimming_to_command(self):
+        """Публикация не обрезает ленты, это делает команда с --trim."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='fresh')
+        self.assertEqual(len(self.timeline_ids(self.reader)), 4)
+        out = StringIO()
+        call_command('rebuild_timelines', '--trim', '--length', '2',
+                     stdout=out)
+        self.assertIn('Обрезано лент: 1', out.getvalue())
+        self.assertEqual(self.timeline_ids(self.reader)[0], post.pk)
+        self.assertEqual(len(self.timeline_ids(self.reader)), 2)
+
+    def test_rebuild_command_restores_timeline(self):
+        """rebuild_timelines восстанавливает ленту по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        expected = self.timeline_ids(self.reader)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_ids(self.reader), expected)
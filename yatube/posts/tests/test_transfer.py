@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import feed_cache
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class ExportImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dump.jsonl.gz')
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=reader, author=author)
+        for number in range(5):
+            post = Post.objects.create(
+                author=author, text=f'Пост {number}',
+                group=group if number % 2 else None)
+            Comment.objects.create(
+                post=post, author=reader, text=f'Комментарий {number}')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self):
+        call_command('export_yatube', self.path, batch_size=2,
+                     stderr=StringIO())
+
+    def load(self, **options):
+        """Загружает выгрузку и возвращает отчет о числе строк."""
+        err = StringIO()
+        call_command('import_yatube', self.path, batch_size=2,
+                     stdout=StringIO(), stderr=err, **options)
+        report = err.getvalue().rpartition('Загружено: ')[2]
+        return json.loads(report.splitlines()[0])
+
+    def snapshot(self):
+        return {
+            'posts': sorted(Post.objects.values_list(
+                'text', 'author__username', 'group__slug', 'pub_date',
+                'comment_count')),
+            'comments': sorted(Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'pub_date')),
+            'follows': sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def test_export_is_gzipped_jsonl(self):
+        self.export()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as stream:
+            models = [json.loads(line)['model'] for line in stream]
+        self.assertEqual(models, ['user'] * 2 + ['group'] + ['post'] * 5
+                         + ['comment'] * 5 + ['follow'])
+
+    def test_round_trip(self):
+        before = self.snapshot()
+        post_ids = set(Post.objects.values_list('pk', flat=True))
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.load()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(
+            set(Post.objects.values_list('pk', flat=True)), post_ids)
+        self.assertEqual(TimelineEntry.objects.count(), 5)
+
+    def test_import_into_filled_database(self):
+        """Посты получают новые id, пользователи и группы переиспользуются."""
+        self.export()
+        reader = User.objects.get(username='reader')
+        token = feed_cache.version(feed_cache.profile_scope(reader.pk))
+        report = self.load()
+        # Один сброс GLOBAL_SCOPE меняет токены всех областей.
+        self.assertNotEqual(
+            feed_cache.version(feed_cache.profile_scope(reader.pk)), token)
+        self.assertEqual(report, {'user': 0, 'group': 0, 'post': 5,
+                                  'comment': 5, 'follow': 0})
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 10)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(Follow.objects.count(), 1)
+        for post in Post.objects.all():
+            self.assertEqual(post.comments.get().text.split()[-1],
+                             post.text.split()[-1])
+
+    def test_comments_of_skipped_posts_are_skipped(self):
+        """Посты без автора не загружаются, а с ними и их комментарии."""
+        writer = User.objects.create_user(username='writer')
+        post = Post.objects.create(author=writer, text='Пост writer')
+        Comment.objects.create(
+            post=post, author=User.objects.get(username='reader'),
+            text='Комментарий writer')
+        self.export()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as stream:
+            lines = [line for line in stream if json.loads(line)[
+                'fields'].get('username') != 'author']
+        with gzip.open(self.path, 'wt', encoding='utf-8') as stream:
+            stream.writelines(lines)
+        User.objects.filter(username='author').delete()
+        Post.objects.all().delete()
+        self.load()
+        self.assertEqual(list(Post.objects.values_list('text', flat=True)),
+                         ['Пост writer'])
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)),
+                         ['Комментарий writer'])
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import trending
+from ..models import Comment, Group, Post, User
+
+NOW: float = 1_000_000_000.0
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание')
+        cls.quiet = Post.objects.create(author=cls.user, text='тихий')
+        cls.busy = Post.objects.create(
+            author=cls.user, text='обсуждаемый', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_activity_is_counted_per_post_and_group(self):
+        trending.record(self.busy, trending.POST_WEIGHT, now=NOW)
+        for _ in range(2):
+            trending.record(self.busy, trending.COMMENT_WEIGHT, now=NOW)
+        trending.record(self.quiet, trending.COMMENT_WEIGHT, now=NOW)
+        totals = trending.scores(now=NOW)
+        self.assertEqual(totals['post'], {self.busy.pk: 5, self.quiet.pk: 1})
+        self.assertEqual(totals['group'], {self.group.pk: 5})
+
+    def test_old_buckets_decay_and_leave_window(self):
+        bucket = trending.TRENDING_BUCKET_SECONDS
+        half_life = trending.TRENDING_HALF_LIFE_BUCKETS * bucket
+        trending.record(self.busy, 4, now=NOW - half_life)
+        trending.record(self.quiet, 4, now=NOW - trending.counter_timeout())
+        totals = trending.scores(now=NOW)
+        self.assertAlmostEqual(totals['post'][self.busy.pk], 2)
+        self.assertNotIn(self.quiet.pk, totals['post'])
+
+    def test_signals_record_posts_and_comments(self):
+        Comment.objects.create(post=self.quiet, author=self.user, text='a')
+        post = Post.objects.create(author=self.user, text='новый',
+                                   group=self.group)
+        totals = trending.scores()
+        self.assertEqual(totals['post'][self.quiet.pk],
+                         trending.COMMENT_WEIGHT)
+        self.assertEqual(totals['post'][post.pk], trending.POST_WEIGHT)
+
+    def test_page_is_one_cache_read_after_compaction(self):
+        for _ in range(3):
+            trending.record(self.busy, trending.COMMENT_WEIGHT)
+        trending.record(self.quiet, trending.COMMENT_WEIGHT)
+        call_command('compact_trending', stdout=StringIO())
+        client = Client()
+        with self.assertNumQueries(0):
+            response = client.get(reverse('posts:trending'))
+        content = response.content.decode()
+        self.assertLess(content.index('обсуждаемый'), content.index('тихий'))
+        self.assertContains(response, reverse(
+            'posts:group_list', args=[self.group.slug]))
+        self.assertTrue(response.context['trending_tab'])
+
+    def test_missing_snapshot_is_built_on_request(self):
+        trending.record(self.busy, trending.COMMENT_WEIGHT)
+        response = Client().get(reverse('posts:trending'))
+        self.assertContains(response, 'обсуждаемый')
+        self.assertIsNotNone(cache.get(trending.SNAPSHOT_KEY))
@@ -1,7 +1,9 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
@@ -63,6 +65,8 @@ class PostVievsTests(TestCase):
                 image=cls.uploaded)
             posts.append(cls.post)
         Post.objects.bulk_create(posts)
+        # bulk_create не вызывает сигналы, счетчики - как после загрузки.
+        call_command('reconcile_counters', stdout=StringIO())
 
     @classmethod
     def tearDownClass(cls):
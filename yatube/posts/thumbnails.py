@@ -0,0 +1,154 @@
+"""Генерация миниатюр картинок постов вне цикла запроса.
+
+Шаблоны только ищут готовую миниатюру в key-value хранилище sorl и, если
+ее еще нет, показывают заглушку. Сами миниатюры создает пул фоновых
+потоков после сохранения поста через PostForm, а для старых постов -
+команда generate_thumbnails.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все размеры, которые запрашивают шаблоны постов.
+POST_CARD = ('960x339', {'crop': 'center'})
+POST_DETAIL = ('960x339', {'crop': 'center', 'upscale': True})
+# WebP-варианты отдаются через <picture>, JPEG остается запасным.
+POST_CARD_WEBP = ('960x339', {'crop': 'center', 'format': 'WEBP'})
+POST_DETAIL_WEBP = ('960x339',
+                    {'crop': 'center', 'upscale': True, 'format': 'WEBP'})
+# Без поддержки WebP в Pillow шаблоны показывают только JPEG.
+WEBP_SUPPORTED = features.check('webp')
+THUMBNAIL_SIZES = (POST_CARD, POST_DETAIL) + (
+    (POST_CARD_WEBP, POST_DETAIL_WEBP) if WEBP_SUPPORTED else ()
+)
+
+THUMBNAIL_WORKERS: int = 2
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl, который только читает уже созданные миниатюры."""
+
+    def lookup(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но без декодирования и записи картинок.
+
+        Возвращает ImageFile готовой миниатюры или None.
+        """
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+lookup_backend = LookupBackend()
+
+
+def lookup(file_, geometry_string, **options):
+    if not file_:
+        return None
+    if options.get('format') == 'WEBP' and not WEBP_SUPPORTED:
+        return None
+    thumbnail = lookup_backend.lookup(file_, geometry_string, **options)
+    metrics.inc('yatube_cache_requests_total', {
+        'cache': 'thumbnail',
+        'result': 'miss' if thumbnail is None else 'hit',
+    })
+    return thumbnail
+
+
+def generate(name):
+    """Создает все размеры миниатюр для картинки в текущем потоке.
+
+    Затем сбрасывает кэш лент и страниц с этой картинкой: в них
+    закэширована заглушка.
+    """
+    for geometry, options in THUMBNAIL_SIZES:
+        default.backend.get_thumbnail(name, geometry, **options)
+    for post in Post.objects.filter(image=name).only('author_id', 'group_id'):
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+class ThumbnailWorkers:
+    """Пул потоков, разбирающий очередь картинок на генерацию.
+
+    Потоки запускаются при первой задаче; одна и та же картинка не
+    ставится в очередь повторно, пока ее не обработали.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def submit(self, name):
+        with self.lock:
+            if name in self.pending:
+                return
+            self.pending.add(name)
+            if not self.threads:
+                self._start()
+        self.queue.put(name)
+
+    def join(self):
+        """Ждет, пока очередь опустеет (для команд и тестов)."""
+        self.queue.join()
+
+    def _start(self):
+        for number in range(self.size):
+            thread = threading.Thread(
+                target=self._run, name=f'thumbnails-{number}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        while True:
+            name = self.queue.get()
+            try:
+                generate(name)
+            except Exception:
+                logger.exception('Не удалось создать миниатюры для %s', name)
+            finally:
+                with self.lock:
+                    self.pending.discard(name)
+                close_old_connections()
+                self.queue.task_done()
+
+
+workers = ThumbnailWorkers(
+    getattr(settings, 'THUMBNAIL_WORKERS', THUMBNAIL_WORKERS)
+)
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в очередь или выполняет ее сразу.
+
+    Синхронный режим включается THUMBNAIL_PIPELINE_ASYNC = False.
+    """
+    if getattr(settings, 'THUMBNAIL_PIPELINE_ASYNC', True):
+        workers.submit(name)
+    else:
+        generate(name)
@@ -0,0 +1,108 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый читатель хранит не больше TIMELINE_LENGTH последних постов
+авторов, на которых он подписан. Лента пополняется при публикации поста,
+догружается при подписке и чистится при отписке.
+
+Публикация только добавляет строки: обрезать ленты всех подписчиков
+пришлось бы в транзакции поста, под блокировкой записи. Переросшие
+ленты обрезает rebuild_timelines --trim по расписанию, до этого в них
+лишь несколько старых записей сверх TIMELINE_LENGTH.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Follow, Post, TimelineEntry
+
+TIMELINE_LENGTH: int = 1000
+BATCH_SIZE: int = 500
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def trim(user_id, length=TIMELINE_LENGTH):
+    """Оставляет в ленте пользователя только length новейших записей."""
+    boundary = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-pub_date', '-id')
+        .values_list('pub_date', 'id')[length:length + 1]
+    )
+    for pub_date, entry_id in boundary:
+        TimelineEntry.objects.filter(user_id=user_id).filter(
+            pub_date__lte=pub_date
+        ).exclude(pub_date=pub_date, id__gt=entry_id).delete()
+
+
+def trim_overflow(length=TIMELINE_LENGTH):
+    """Обрезает все ленты длиннее length, возвращает их число."""
+    user_ids = list(
+        TimelineEntry.objects.order_by().values('user_id').annotate(
+            size=Count('id')
+        ).filter(size__gt=length).values_list('user_id', flat=True)
+    )
+    for user_id in user_ids:
+        trim(user_id, length)
+    return len(user_ids)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    batch = []
+    for user_id in follower_ids:
+        batch.append(user_id)
+        if len(batch) >= BATCH_SIZE:
+            _fan_out_batch(post, batch)
+            batch = []
+    if batch:
+        _fan_out_batch(post, batch)
+
+
+def _fan_out_batch(post, user_ids):
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id, length=TIMELINE_LENGTH):
+    """Догружает в ленту последние посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).only('pk', 'author_id', 'pub_date')[:length]
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id, length)
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_id, length=TIMELINE_LENGTH):
+    """Пересобирает ленту пользователя с нуля по таблице Follow."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).order_by('-pub_date', '-id').only(
+        'pk', 'author_id', 'pub_date'
+    )[:length]
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
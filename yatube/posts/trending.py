@@ -0,0 +1,127 @@
+"""Популярные посты и группы по активности в скользящем окне.
+
+Публикация поста и комментарий увеличивают счетчики в кэше: на пост и
+на его группу в корзине времени TRENDING_BUCKET_SECONDS. SQL при этом
+не выполняется, обычно это одна операция incr в кэше; объект, впервые
+попавший в корзину, еще добавляется в список ее слотов.
+
+Уплотнение (compact, команда compact_trending по расписанию) читает
+корзины окна, складывает счетчики с затуханием по возрасту корзины и
+сохраняет готовый HTML рейтинга, поэтому страница /trending/ - одно
+чтение из кэша. Если снимок истек, а команда не запускалась, его
+пересобирает первый запрос.
+"""
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.template.loader import get_template
+
+from .models import Group, Post
+
+TRENDING_BUCKET_SECONDS: int = 10 * 60
+TRENDING_WINDOW_BUCKETS: int = 36
+# Вклад корзины уменьшается вдвое каждые TRENDING_HALF_LIFE_BUCKETS.
+TRENDING_HALF_LIFE_BUCKETS: int = 6
+TRENDING_SNAPSHOT_TIMEOUT: int = 5 * 60
+TRENDING_POSTS: int = 10
+TRENDING_GROUPS: int = 5
+POST_WEIGHT: int = 3
+COMMENT_WEIGHT: int = 1
+PREFIX = 'trending:'
+SNAPSHOT_KEY = PREFIX + 'snapshot'
+KINDS = ('post', 'group')
+LIST_TEMPLATE = 'posts/includes/trending_list.html'
+
+
+def bucket_of(now):
+    return int(now // TRENDING_BUCKET_SECONDS)
+
+
+def counter_timeout():
+    return (TRENDING_WINDOW_BUCKETS + 1) * TRENDING_BUCKET_SECONDS
+
+
+def _incr(key, delta):
+    """Увеличивает счетчик, создавая его при отсутствии.
+
+    Счетчики только растут, поэтому результат, равный delta, означает,
+    что ключ создан этим вызовом.
+    """
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, counter_timeout()):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _count(bucket, kind, object_id, weight):
+    prefix = f'{PREFIX}{bucket}:{kind}'
+    if _incr(f'{prefix}:{object_id}', weight) == weight:
+        # Объект впервые в корзине: запоминается в слоте списка корзины.
+        slot = _incr(prefix, 1)
+        cache.set(f'{prefix}#{slot}', object_id, counter_timeout())
+
+
+def record(post, weight, now=None):
+    """Активность у поста: публикация или комментарий."""
+    bucket = bucket_of(time.time() if now is None else now)
+    _count(bucket, 'post', post.pk, weight)
+    if post.group_id is not None:
+        _count(bucket, 'group', post.group_id, weight)
+
+
+def scores(now=None):
+    """Счетчики окна с затуханием: вид -> Counter(id -> вес)."""
+    current = bucket_of(time.time() if now is None else now)
+    buckets = range(current - TRENDING_WINDOW_BUCKETS + 1, current + 1)
+    result = {}
+    for kind in KINDS:
+        prefixes = {f'{PREFIX}{bucket}:{kind}': bucket for bucket in buckets}
+        sizes = cache.get_many(list(prefixes))
+        slots = cache.get_many([
+            f'{prefix}#{slot}'
+            for prefix, size in sizes.items()
+            for slot in range(1, size + 1)
+        ])
+        counters = {}
+        for key, object_id in slots.items():
+            prefix = key.partition('#')[0]
+            counters[f'{prefix}:{object_id}'] = (prefixes[prefix], object_id)
+        totals = Counter()
+        for key, value in cache.get_many(list(counters)).items():
+            bucket, object_id = counters[key]
+            age = current - bucket
+            totals[object_id] += value * 0.5 ** (
+                age / TRENDING_HALF_LIFE_BUCKETS)
+        result[kind] = totals
+    return result
+
+
+def _ranked(queryset, totals, limit):
+    ids = [object_id for object_id, _ in totals.most_common(limit)]
+    objects = queryset.in_bulk(ids)
+    return [objects[object_id] for object_id in ids if object_id in objects]
+
+
+def compact(now=None):
+    """Собирает и сохраняет снимок рейтинга, возвращает его HTML."""
+    totals = scores(now)
+    posts = _ranked(Post.objects.for_feed(), totals['post'], TRENDING_POSTS)
+    groups = [
+        (group, round(totals['group'][group.pk], 1))
+        for group in _ranked(Group.objects.all(), totals['group'],
+                             TRENDING_GROUPS)
+    ]
+    html = get_template(LIST_TEMPLATE).render(
+        {'posts': posts, 'groups': groups})
+    cache.set(SNAPSHOT_KEY, html, TRENDING_SNAPSHOT_TIMEOUT)
+    return html
+
+
+def snapshot():
+    html = cache.get(SNAPSHOT_KEY)
+    if html is None:
+        html = compact()
+    return html
@@ -1,9 +1,168 @@
-from django.core.paginator import Paginator
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
 
 LAST_10_POSTS: int = 10
+SHALLOW_PAGES: int = 5
+COMMENTS_PER_PAGE: int = 20
+
+
+def encode_cursor(direction, obj):
+    """Непрозрачный токен позиции в ленте по ключу (pub_date, id)."""
+    raw = json.dumps([direction, obj.pub_date.isoformat(), obj.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, id) или None для битого токена."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, pub_date, pk = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        pub_date = parse_datetime(pub_date)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if direction not in ('next', 'prev') or pub_date is None:
+        return None
+    if not isinstance(pk, int):
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Совместима с шаблоном paginator.html: вместо номеров страниц
+    отдает токены next_cursor/previous_cursor и не знает общего числа
+    записей.
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.number + 1 if self.number else None
+
+    def previous_page_number(self):
+        return self.number - 1 if self.number else None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) от новых записей к старым.
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница - это диапазонное
+    чтение после (или до) записи, закодированной в курсоре. Номера
+    страниц поддерживаются только для первых SHALLOW_PAGES страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    # Условие записано как диапазон по pub_date с исключением, а не
+    # через OR: так SQLite ищет начало страницы по индексу, а не
+    # сканирует его с начала.
+    def _after(self, pub_date, pk):
+        return self.object_list.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, pk__gte=pk
+        ).order_by('-pub_date', '-pk')
+
+    def _before(self, pub_date, pk):
+        return self.object_list.filter(pub_date__gte=pub_date).exclude(
+            pub_date=pub_date, pk__lte=pk
+        ).order_by('pub_date', 'pk')
+
+    def rows(self, cursor=None):
+        """Все записи от начала ленты или после курсора 'next'.
+
+        Для потоковой выдачи: срез и обход делает вызывающий код.
+        """
+        if cursor is None:
+            return self.object_list.order_by('-pub_date', '-pk')
+        _, pub_date, pk = cursor
+        return self._after(pub_date, pk)
+
+    def page(self, cursor=None, number=1):
+        per_page = self.per_page
+        if cursor is not None:
+            direction, pub_date, pk = cursor
+            number = None
+            if direction == 'next':
+                items = list(self._after(pub_date, pk)[:per_page + 1])
+                has_next, has_previous = len(items) > per_page, True
+                items = items[:per_page]
+            else:
+                items = list(self._before(pub_date, pk)[:per_page + 1])
+                has_next, has_previous = True, len(items) > per_page
+                items = items[:per_page][::-1]
+        else:
+            offset = (number - 1) * per_page
+            items = list(
+                self.object_list.order_by('-pub_date', '-pk')
+                [offset:offset + per_page + 1]
+            )
+            has_next, has_previous = len(items) > per_page, number > 1
+            items = items[:per_page]
+        return CursorPage(
+            items, number, self,
+            next_cursor=(
+                encode_cursor('next', items[-1])
+                if has_next and items else None
+            ),
+            previous_cursor=(
+                encode_cursor('prev', items[0])
+                if has_previous and items else None
+            ),
+        )
+
+    def get_page(self, cursor=None, number=None):
+        """Как Paginator.get_page: битые параметры дают первую страницу.
+
+        Номер дальше SHALLOW_PAGES - 404: такая страница доступна только
+        по курсору, а подмена другой страницей выглядела бы как верная.
+        """
+        if cursor:
+            decoded = decode_cursor(cursor)
+            if decoded is not None:
+                return self.page(cursor=decoded)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number > SHALLOW_PAGES:
+            raise Http404(
+                f'Страницы дальше {SHALLOW_PAGES}-й доступны по курсору.')
+        return self.page(number=max(number, 1))
+
+
+def use_cursor_pagination(request):
+    return (getattr(settings, 'POSTS_CURSOR_PAGINATION', False)
+            or 'cursor' in request.GET)
 
 
-def paginator_create(request, list):
-    paginator = Paginator(list, LAST_10_POSTS)
+def paginator_create(request, object_list, cursor=None):
+    if cursor is None:
+        cursor = use_cursor_pagination(request)
+    if cursor:
+        paginator = CursorPaginator(object_list, LAST_10_POSTS)
+        return paginator.get_page(
+            request.GET.get('cursor'), request.GET.get('page')
+        )
+    paginator = Paginator(object_list, LAST_10_POSTS)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
@@ -1,64 +1,149 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response
+from django.utils.safestring import mark_safe
 
+from core.db import write_view
+
+from . import (feed_cache, follow_graph, recommendations,
+               search as post_search, trending as post_trending)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
-from .utils import paginator_create
+from .models import (Comment, Group, Post, User, Follow, TimelineEntry,
+                     UserStats)
+from .utils import (COMMENTS_PER_PAGE, LAST_10_POSTS, CursorPaginator,
+                    paginator_create)
+
+
+def comments_page(request, post):
+    """Самые новые комментарии или порция после курсора из ?cursor=."""
+    paginator = CursorPaginator(
+        Comment.objects.for_post(post), COMMENTS_PER_PAGE)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def conditional(request, *scopes):
+    """ETag страницы из областей scopes и ответ 304, если он совпал."""
+    etag = feed_cache.etag(request, *scopes)
+    return etag, get_conditional_response(request, etag=etag)
+
+
+def render_with_etag(request, template, context, etag):
+    response = render(request, template, context)
+    response['ETag'] = etag
+    return response
 
 
 def index(request):
-    post_list = Post.objects.all()
+    etag, not_modified = conditional(request, feed_cache.INDEX_SCOPE)
+    if not_modified is not None:
+        return not_modified
+    post_list = Post.objects.for_feed()
     page_obj = paginator_create(request, post_list)
     context = {
         'page_obj': page_obj,
         'index': True,
+        'feed_scope': feed_cache.INDEX_SCOPE,
     }
-    return render(request, 'posts/index.html', context)
+    return render_with_etag(request, 'posts/index.html', context, etag)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    etag, not_modified = conditional(
+        request, feed_cache.group_scope(group.pk))
+    if not_modified is not None:
+        return not_modified
+    post_list = group.posts.for_feed()
     page_obj = paginator_create(request, post_list)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_scope': feed_cache.group_scope(group.pk),
     }
-    return render(request, 'posts/group_list.html', context)
+    return render_with_etag(request, 'posts/group_list.html', context, etag)
 
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    scopes = [feed_cache.profile_scope(author.pk),
+              feed_cache.follow_scope(author.pk)]
+    if request.user.is_authenticated:
+        scopes.append(feed_cache.recommendations_scope(request.user.pk))
+    etag, not_modified = conditional(request, *scopes)
+    if not_modified is not None:
+        return not_modified
+    post_list = author.posts.for_feed()
     page_obj = paginator_create(request, post_list)
-    post_count = post_list.count()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
+    stats = UserStats.objects.for_user(author)
+    following = request.user.is_authenticated and follow_graph.follows(
+        request.user.pk, author.pk)
     context = {
         'author': author,
-        'post_count': post_count,
+        'post_count': stats.post_count,
+        'follower_count': stats.follower_count,
+        'following_count': stats.following_count,
         'page_obj': page_obj,
         'following': following,
+        'recommendations': recommendations.for_user(request.user),
+        'feed_scope': feed_cache.profile_scope(author.pk),
     }
-    return render(request, 'posts/profile.html', context)
+    return render_with_etag(request, 'posts/profile.html', context, etag)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = post.author.posts.count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    etag, not_modified = conditional(
+        request,
+        feed_cache.post_scope(post.pk),
+        feed_cache.profile_scope(post.author_id),
+    )
+    if not_modified is not None:
+        return not_modified
+    post_count = UserStats.objects.for_user(post.author).post_count
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comments_page(request, post)
     context = {
         'post': post,
         'post_count': post_count,
         'form': form,
         'comments': comments,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render_with_etag(request, 'posts/post_detail.html', context, etag)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = post_search.SearchPaginator(query, LAST_10_POSTS).get_page(
+        request.GET.get('cursor')
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def trending(request):
+    """Рейтинг из готового снимка: одно чтение из кэша."""
+    context = {
+        'trending': mark_safe(post_trending.snapshot()),
+        'trending_tab': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def post_comments(request, post_id):
+    """Фрагмент HTML со следующей порцией комментариев для подгрузки."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
 
 
 @login_required
+@write_view
 def post_create(request):
     form = PostForm(request.POST, files=request.FILES or None)
     if request.method == 'POST':
@@ -71,6 +156,7 @@ def post_create(request):
 
 
 @login_required
+@write_view
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = PostForm(request.POST or None,
@@ -85,6 +171,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@write_view
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -98,16 +185,19 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_create(request, post_list)
+    entries = TimelineEntry.objects.for_feed(request.user)
+    page_obj = paginator_create(request, entries)
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
         'follow': True,
+        'recommendations': recommendations.for_user(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@write_view
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -116,6 +206,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@write_view
 def profile_unfollow(request, username):
     Follow.objects.filter(user=request.user,
                           author__username=username).delete()
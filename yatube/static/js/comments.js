@@ -0,0 +1,23 @@
+// Подгружает следующую порцию комментариев без перезагрузки страницы.
+// Без JavaScript ссылка "Показать еще" просто открывает следующую страницу.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-fragment]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  fetch(link.dataset.commentsFragment, {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.closest('.comments-more').outerHTML = html;
+    })
+    .catch(function () {
+      window.location = link.href;
+    });
+});
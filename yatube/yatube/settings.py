@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,11 +52,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -70,9 +76,10 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендера для /metrics.
+        'BACKEND': 'core.backends.templates.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
+        'APP_DIRS': DEBUG,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -84,6 +91,16 @@ TEMPLATES = [
         },
     },
 ]
+if not DEBUG:
+    # Шаблоны компилируются один раз на процесс и не читаются с диска на
+    # каждый include: после правки шаблона нужен рестарт. В DEBUG правки
+    # видны сразу.
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -93,11 +110,69 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с BEGIN IMMEDIATE для транзакций, см. core/db.py.
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Тестовая база в файле, а не в памяти: разделяемый кэш базы в
+        # памяти не поддерживает WAL и busy_timeout, и потоки load_test
+        # получают "database table is locked" вместо ожидания.
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
     }
 }
 
+# Реплики для чтения: YATUBE_REPLICAS=2 добавляет базы replica1 и
+# replica2 в файлах replicaN.sqlite3. Их копирует из основной базы
+# команда sync_replicas (например, sync_replicas --interval 5).
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1)
+]
+DATABASES.update({
+    alias: {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    for alias in DATABASE_REPLICAS
+})
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы.
+REPLICA_STICKY_SECONDS = 10
+
+# Профилирование запросов cProfile (core/profiling.py): доля случайных
+# запросов и каталог для .prof и .collapsed, по PROFILING_KEEP на view.
+# Запрос с заголовком X-Profile из команды profile_token профилируется
+# всегда.
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_KEEP = 100
+
+# Метрики Prometheus на /metrics (core/metrics.py): каталог файлов
+# счетчиков процессов и адреса, которым отдается /metrics.
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Ограничение частоты изменяющих запросов (core/ratelimit.py): token
+# bucket на пользователя и на IP для view; 'N/m' - N запросов подряд
+# и N за минуту. methods - какие методы учитывать (по умолчанию все).
+RATE_LIMITS = {
+    'posts:add_comment': {'user': '30/m', 'ip': '120/m',
+                          'methods': ['POST']},
+    'posts:post_create': {'user': '10/m', 'ip': '60/m', 'methods': ['POST']},
+    'posts:post_edit': {'user': '30/m', 'ip': '120/m', 'methods': ['POST']},
+    'posts:profile_follow': {'user': '60/m', 'ip': '240/m'},
+    'posts:profile_unfollow': {'user': '60/m', 'ip': '240/m'},
+    'users:signup': {'ip': '20/h', 'methods': ['POST']},
+}
+
+# PRAGMA для каждого нового соединения SQLite поверх значений
+# по умолчанию из core.db.SQLITE_PRAGMAS.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,8 +224,40 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# manage.py test подставляет временные MEDIA_ROOT и кэш (core/testing.py).
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Кэш в файле SQLite (WAL), общий для всех воркеров на хосте: фрагменты
+# лент рендерятся один раз, а инвалидация видна каждому процессу.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 2 ** 20,
+        },
     }
 }
+
+# Курсорная пагинация лент по (pub_date, id) без COUNT(*) и OFFSET.
+# Ссылки вида ?page=N продолжают работать для первых страниц.
+POSTS_CURSOR_PAGINATION = False
+
+# Бюджеты SQL-запросов на один запрос к view. Превышение логируется,
+# а при QUERY_BUDGET_STRICT = True (включается в тестах) - падает.
+# Профиль и лента подписок читают еще и блок "кого почитать".
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 8,
+    'posts:post_detail': 5,
+    'posts:follow_index': 5,
+}
+QUERY_BUDGET_STRICT = False
+QUERY_STATS_HEADERS = DEBUG
+
+# Миниатюры картинок постов создаются фоновым пулом потоков после
+# сохранения формы; False - создавать сразу в том же потоке.
+THUMBNAIL_PIPELINE_ASYNC = True
+THUMBNAIL_WORKERS = 2